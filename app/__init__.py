@@ -1,4 +1,2 @@
 
 from .database import SessionLocal
-
-db = SessionLocal()
\ No newline at end of file
@@ -7,6 +7,8 @@ from langchain.schema import HumanMessage, SystemMessage, AIMessage
 
 router = APIRouter()
 
+CHAT_SYSTEM_PROMPT = "Ты - юридический ассистент."
+
 # Хранилище истории чатов в памяти: chat_id -> list of messages
 chat_histories: Dict[str, List[dict]] = {}
 
@@ -26,7 +28,7 @@ async def chat_endpoint(req: ChatRequest):
     # Получаем историю чата или создаём новую
     if req.chat_id not in chat_histories:
         chat_histories[req.chat_id] = [
-            {"role": "system", "content": "Ты - юридический ассистент."}
+            {"role": "system", "content": CHAT_SYSTEM_PROMPT}
         ]
     # Добавляем новое сообщение пользователя
     chat_histories[req.chat_id].append({"role": "user", "content": req.message})
@@ -147,9 +147,8 @@ async def verify_code(
         is_verified=True
     )
     db.add(db_user)
-    db.commit()
 
-    # Удаляем запись из TempUser
+    # Удаляем запись из TempUser в той же транзакции
     db.delete(temp_user)
     db.commit()
 
@@ -270,9 +269,8 @@ async def reset_password(
 
     # Изменить пароль пользователя
     user.hashed_password = get_password_hash(request.new_password)
-    db.commit()
 
-    # Отметить код как использованный
+    # Отметить код как использованный и сохранить оба изменения одной транзакцией
     reset_entry.is_used = True
     db.commit()
 
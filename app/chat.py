@@ -7,9 +7,10 @@ import asyncio
 import json
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 import unicodedata
 
-from fastapi import Request, UploadFile, File, Form, HTTPException, FastAPI, APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi import Request, UploadFile, File, Form, HTTPException, FastAPI, APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
@@ -19,12 +20,12 @@ import aiofiles
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import User, Message, Thread, Document, get_messages
+from app.models import User, Message, Thread, Document, get_messages, bulk_insert_messages
 from app.auth import get_current_user
 from app.handlers.web_search import WebSearchHandler
 from app.handlers.ai_request import send_custom_request, deep_research_service
 from app.handlers.es_law_search import search_law_chunks
-from app.handlers.user_doc_request import extract_text_from_any_document, process_uploaded_file
+from app.handlers.user_doc_request import extract_text_from_any_document, process_uploaded_file, SUPPORTED_EXTENSIONS
 from transliterate import translit
 from app.utils.text_utils import decode_unicode
 
@@ -32,10 +33,6 @@ from app.utils.text_utils import decode_unicode
 # Загрузка переменных окружения
 load_dotenv()
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO,
-                    format="%(asctime)s - %(levelname)s - %(message)s")
-
 # Папки для хранения файлов
 UPLOAD_FOLDER = "uploads"
 DOCX_FOLDER = "documents_docx"
@@ -167,9 +164,9 @@ async def chat_in_thread(
         )
 
         # Сохраняем сообщения в чат
-        db.add_all([
-            Message(thread_id=thread_id, role="user", content=file_info),
-            Message(thread_id=thread_id, role="assistant", content=recognized_text_response)
+        bulk_insert_messages(db, [
+            {"thread_id": thread_id, "role": "user", "content": file_info},
+            {"thread_id": thread_id, "role": "assistant", "content": recognized_text_response}
         ])
         db.commit()
 
@@ -261,11 +258,20 @@ async def get_threads(current_user: User = Depends(get_current_user),
 @router.get("/messages/{thread_id}")
 async def get_thread_messages(
     thread_id: str,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Возвращает сообщения из выбранного треда."""
-    return await get_messages(thread_id=thread_id, db=db, user_id=current_user.id)
+    """
+    Возвращает сообщения из выбранного треда.
+
+    Без параметров отдаёт весь тред; с limit — страницу, следующая
+    запрашивается с after=<id последнего сообщения>.
+    """
+    return await get_messages(
+        thread_id=thread_id, db=db, user_id=current_user.id, after=after, limit=limit
+    )
 
 
 # ===================== Эндпоинты для загрузки и скачивания файлов =====================
@@ -435,8 +441,7 @@ async def upload_file(file: UploadFile = File(...),
         allow_headers=["*"],
     )
     """Загружает файл и сохраняет в базе данных."""
-    if not file.filename.lower().endswith(
-        ('.pdf', '.doc', '.docx', '.xlsx', '.jpg', '.jpeg', '.tif', '.tiff')):
+    if os.path.splitext(file.filename)[1].lower() not in SUPPORTED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=
@@ -538,9 +543,9 @@ async def create_and_return_file(
         # Избегаем пробелов в имени файла
         download_filename = download_filename.replace(" ", "_")
 
-        # Путь к файлу временного хранения (с добавлением временной метки для уникальности)
+        # Путь к файлу временного хранения (метка времени и случайный суффикс для уникальности)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        internal_filename = f"{timestamp}_{download_filename}"
+        internal_filename = f"{timestamp}_{uuid.uuid4().hex[:8]}_{download_filename}"
         file_path = os.path.join(UPLOAD_FOLDER, internal_filename)
 
         # Добавляем имя файла в логи для отладки
@@ -62,6 +62,12 @@ else:
 # Основной URL для базы данных (используется в приложении)
 DATABASE_URL = MYSQL_DATABASE_URL
 
+# Параметры пула соединений и порог логирования медленных запросов
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))  # 0 — замер отключён
+
 # ===== Elasticsearch Configuration =====
 ES_HOST = os.getenv("ES_HOST", "http://localhost:9200")
 ES_USER = os.getenv("ES_USER", None)
@@ -107,6 +113,7 @@ DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 DEEPSEEK_API_BASE = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com/v1")
 DEEPSEEK_MODEL = os.getenv("DEEPSEEK_MODEL", "deepseek-reasoner")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", DEEPSEEK_API_KEY)  # Используем DEEPSEEK_API_KEY как запасной вариант
+DEEPSEEK_MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "8"))  # Одновременных запросов к модели на процесс
 
 # Логируем конфигурацию AI провайдера
 logger.info(f"AI Provider: {AI_PROVIDER}")
@@ -166,3 +173,8 @@ TAVILY_SEARCH_PARAMS = {
     "max_tokens": 8000
 }
 
+# ===== HTTP Client Configuration =====
+# Буфер чтения общих сессий aiohttp (WebScraper, Tavily): большие страницы вычитываются
+# за меньшее число обращений к сокету
+HTTP_READ_BUFSIZE = int(os.getenv("HTTP_READ_BUFSIZE", str(4 * 1024 * 1024)))
+
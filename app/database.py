@@ -1,21 +1,54 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.config import MYSQL_DATABASE_URL, POSTGRES_DATABASE_URL
+from app.config import (
+    MYSQL_DATABASE_URL, POSTGRES_DATABASE_URL,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, SLOW_QUERY_THRESHOLD_MS
+)
 from app.utils.logger import get_logger
 import os
+import time
 from urllib.parse import quote_plus
 
 # Инициализируем логгер
 logger = get_logger()
 
+# Замер времени запросов: при SLOW_QUERY_THRESHOLD_MS <= 0 обработчики не регистрируются,
+# и выполнение запросов не несёт накладных расходов на хуки
+if SLOW_QUERY_THRESHOLD_MS > 0:
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        """Запоминает время начала запроса (стек — на случай вложенных выполнений)."""
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+        """Логирует запросы, выполнявшиеся дольше SLOW_QUERY_THRESHOLD_MS."""
+        elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        if elapsed_ms > SLOW_QUERY_THRESHOLD_MS:
+            logger.warning(f"🐢 Медленный запрос ({elapsed_ms:.0f} мс): {statement[:500]}")
+
+    @event.listens_for(Engine, "handle_error")
+    def _drop_query_timer(exception_context):
+        """Снимает отметку времени упавшего запроса, чтобы стек не рос."""
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
+
 # Используем MySQL для основных данных приложения
 try:
     if not MYSQL_DATABASE_URL:
         raise ValueError("MYSQL_DATABASE_URL не определен")
         
     logger.info(f"Попытка подключения к MySQL: {MYSQL_DATABASE_URL.split('@')[1] if '@' in MYSQL_DATABASE_URL else 'URL скрыт'}")
-    engine = create_engine(MYSQL_DATABASE_URL, pool_pre_ping=True, pool_recycle=3600)
+    engine = create_engine(
+        MYSQL_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE
+    )
     connection = engine.connect()
     result = connection.execute(text("SELECT 1"))
     connection.close()
@@ -25,6 +58,18 @@ except Exception as e:
     # Фоллбек на SQLite
     DATABASE_URL = "sqlite:///./app.db"
     engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Настраивает каждое новое соединение SQLite из пула (WAL, кэш страниц, mmap)."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
     logger.warning(f"⚠️ Используется фоллбек на SQLite: {DATABASE_URL}")
 
 
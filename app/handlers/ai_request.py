@@ -6,21 +6,19 @@ from typing import Dict, Optional, List, Any
 from sqlalchemy.orm import Session 
 import json
 import asyncio
-from app.handlers.parallel_search import run_parallel_search
 from app.handlers.es_law_search import search_law_chunks
 from app.handlers.web_search import run_multiple_searches
-from app.services.deepresearch_service import DeepResearchService
+from app.services.deepresearch_service import deep_research_service
 from app.services.deepseek_service import DeepSeekService
 from app.models import get_messages
 from app.config import DEEPSEEK_API_KEY, DEEPSEEK_MODEL
 from app.context_manager import ContextManager
-from app.utils.logger import get_logger
+from app.utils.logger import get_logger, LogLevel
 
 # Инициализация логгера
 logger = get_logger()
 
-# Инициализация сервисов
-deep_research_service = DeepResearchService()
+# Инициализация сервисов (DeepResearchService общий на всё приложение: его HTTP-клиенты держат пул соединений)
 deepseek_service = DeepSeekService()
 
 # Инициализация менеджера контекста
@@ -39,8 +37,10 @@ RESEARCH_SYSTEM_PROMPT = """Ты - профессиональный юридич
 
 def log_function_call(function_name: str, arguments: Dict) -> None:
     """Логирует вызов функции с аргументами для отладки."""
-    logger.info(f"🔍 ФУНКЦИЯ ВЫЗВАНА: {function_name}")
-    logger.info(f"🔍 АРГУМЕНТЫ: {json.dumps(arguments, ensure_ascii=False)}")
+    logger.info("🔍 ФУНКЦИЯ ВЫЗВАНА: %s", function_name)
+    # Сериализация аргументов нужна только для записи в лог
+    if logger.isEnabledFor(LogLevel.INFO):
+        logger.info("🔍 АРГУМЕНТЫ: %s", json.dumps(arguments, ensure_ascii=False))
 
 def format_chat_history(chat_history: List[Dict]) -> str:
     """
@@ -88,7 +88,7 @@ async def send_custom_request(
     Returns:
         str: Ответ ассистента
     """
-    logger.info(f"📝 Новый запрос пользователя: {user_query[:100]}...")
+    logger.info("📝 Новый запрос пользователя: %.100s...", user_query)
     try:
         # Получаем историю сообщений
         messages = None
@@ -99,26 +99,19 @@ async def send_custom_request(
                 logger.warning("❌ Не удалось распарсить переданную историю чата как JSON")
         if not messages and thread_id and db:
             messages = await get_messages(thread_id, db)
-            logger.info(f"📜 Получена история чата: {len(messages)} сообщений")
+            logger.info("📜 Получена история чата: %d сообщений", len(messages))
         if not messages:
             messages = []
         # Определяем тип запроса
-        research_service = DeepResearchService()
+        research_service = deep_research_service
         is_general = research_service.is_general_query(user_query)
         system_prompt = GENERAL_SYSTEM_PROMPT if is_general else RESEARCH_SYSTEM_PROMPT
         deepseek_messages = build_deepseek_messages(system_prompt, messages, user_query)
-        # Выполняем поиск только для юридических запросов
-        search_results = None
-        if not is_general:
-            logger.info("🚀 Запуск параллельного поиска для юридического запроса")
-            search_results = await run_parallel_search(user_query)
-        else:
-            logger.info("📝 Обработка общего запроса без поиска")
-        # Получаем результат исследования, передавая массив сообщений
+        # Поиск по ES и Tavily для юридических запросов выполняет сам research():
+        # отдельный предварительный поиск здесь дублировал бы оба запроса
         result = await research_service.research(
             query=user_query,
             chat_history=deepseek_messages,  # теперь это массив сообщений
-            search_data=search_results,
             thread_id=thread_id,
             db=db
         )
@@ -196,14 +189,14 @@ async def handle_function_call(function_name: str, arguments: Dict, thread_id: O
     if function_name == "search_law_chunks":
         try:
             logger.info("🔍 Выполнение поиска в Elasticsearch для запроса: '%s'", query)
-            es_results = search_law_chunks(query)
+            es_results = await search_law_chunks(query)
             if es_results:
-                logger.info(f"✅ Найдено {len(es_results)} релевантных чанков в Elasticsearch")
+                logger.info("✅ Найдено %d релевантных чанков в Elasticsearch", len(es_results))
                 for i, chunk in enumerate(es_results[:2]):  # Выводим первые 2 чанка для проверки
-                    logger.info(f"📄 Чанк {i+1}: {chunk[:100]}...")
+                    logger.info("📄 Чанк %d: %.100s...", i + 1, chunk.get("text", ""))
 
                 # Соединяем все найденные чанки в один текст
-                combined_text = "\n\n".join(es_results)
+                combined_text = "\n\n".join(chunk.get("text", "") for chunk in es_results)
 
                 # Используем DeepResearch для анализа найденного законодательства
                 result = await deep_research_service.research(
@@ -279,21 +272,27 @@ async def handle_function_call(function_name: str, arguments: Dict, thread_id: O
             logs = []
             additional_context = []
 
-            # 1. Поиск в Elasticsearch
-            try:
-                es_results = search_law_chunks(query)
-                if es_results:
-                    additional_context.append({
-                        "type": "legislation",
-                        "found": True,
-                        "data": es_results[:10]  # Берем до 10 наиболее релевантных результатов
-                    })
-            except Exception as e:
-                logger.error(f"Ошибка при получении контекста из Elasticsearch: {str(e)}")
+            # Поиск в Elasticsearch и в интернете выполняем одновременно
+            es_results, web_results = await asyncio.gather(
+                search_law_chunks(query),
+                run_multiple_searches(query, logs),
+                return_exceptions=True
+            )
+
+            # 1. Результаты Elasticsearch
+            if isinstance(es_results, Exception):
+                logger.error(f"Ошибка при получении контекста из Elasticsearch: {str(es_results)}")
+            elif es_results:
+                additional_context.append({
+                    "type": "legislation",
+                    "found": True,
+                    "data": es_results[:10]  # Берем до 10 наиболее релевантных результатов
+                })
 
-            # 2. Поиск в интернете
+            # 2. Результаты поиска в интернете
             try:
-                web_results = await run_multiple_searches(query, logs)
+                if isinstance(web_results, Exception):
+                    raise web_results
                 all_web_results = []
                 for search_type, results in web_results.items():
                     all_web_results.extend(results)
@@ -1,6 +1,7 @@
 from typing import List, Dict, Any, Optional
 from elasticsearch import Elasticsearch
 import re
+import asyncio
 import os
 import json
 from app.config import ELASTICSEARCH_URL, ES_INDICES as CONFIG_ES_INDICES
@@ -15,6 +16,43 @@ ES_USER = os.getenv("ES_USER", None)
 ES_PASS = os.getenv("ES_PASS", None)
 
 
+# Расширенный шаблон номера арбитражного дела (А40-12345/2023, в т.ч. с суффиксами), компилируется один раз
+ARBITRATION_CASE_NUMBER_RE = re.compile(r'[АA]\d{1,2}-\d+/\d{2,4}(?!\d)(?:-[А-Яа-яA-Za-z0-9]+)*')
+# Литерал, обязательный в любом номере дела: текст без него не сканируем регуляркой
+CASE_NUMBER_MARKER = "/"
+
+# Шаблоны реквизитов компании в порядке приоритета ("ООО", "ЗАО", ..., ОГРН, ИНН)
+COMPANY_NAME_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'ООО\s+[«"]?([^»"]+)[»"]?',
+    r'ЗАО\s+[«"]?([^»"]+)[»"]?',
+    r'ОАО\s+[«"]?([^»"]+)[»"]?',
+    r'ПАО\s+[«"]?([^»"]+)[»"]?',
+    r'ИП\s+([А-Яа-я\s]+)',
+    r'ОГРН\s+(\d{13}|\d{15})',
+    r'ИНН\s+(\d{10}|\d{12})'
+))
+
+
+# Типы процессуальных документов в порядке приоритета (все в нижнем регистре)
+DOCUMENT_TYPES = (
+    "исковое заявление", "иск", "претензия", "отзыв", "отзыв на исковое заявление",
+    "ходатайство", "апелляционная жалоба", "кассационная жалоба",
+    "заявление", "возражение", "договор", "соглашение", "жалоба", "мировое соглашение",
+    "согласие", "административное исковое заявление", "замечаение", "ответ", "приложение к исковому заявлению",
+    "расписка", "расчет", "контррасчет", "ответ на претензию", "замечания на протокол", "независимая гарантия",
+    "ответ на определение суда", "расчет исковых требований", "расчет убытков"
+)
+
+
+# Сколько символов текста документа попадает в отформатированный результат
+PREVIEW_MAX_CHARS = 2000
+
+
+def truncate_preview(text: str, limit: int = PREVIEW_MAX_CHARS, suffix: str = "...") -> str:
+    """Обрезает текст до limit символов; suffix добавляется, только если текст действительно обрезан."""
+    return text if len(text) <= limit else text[:limit] + suffix
+
+
 # Индексы в Elasticsearch с возможностью переопределения из конфигурации
 DEFAULT_ES_INDICES = {
     "court_decisions": "court_decisions_index",
@@ -74,14 +112,11 @@ class SmartSearchService:
 
     def extract_case_number(self, query: str) -> Optional[str]:
         """Извлекает номер дела из текста запроса"""
-        # Расширенный шаблон для поиска номеров дел различных форматов
-        pattern = r'[АA]\d{1,2}-\d+/\d{2,4}(?:-[А-Яа-яA-Za-z0-9]+)*'
-
         # Обеспечиваем, что текст запроса в правильной кодировке
         if isinstance(query, bytes):
             query = query.decode('utf-8')
 
-        match = re.search(pattern, query)
+        match = ARBITRATION_CASE_NUMBER_RE.search(query) if CASE_NUMBER_MARKER in query else None
         if match:
             case_number = match.group(0)
             logger.log(f"SmartSearchService: Извлечен номер дела: {case_number}", LogLevel.INFO)
@@ -104,18 +139,8 @@ class SmartSearchService:
     def extract_company_name(self, query: str) -> Optional[str]:
         """Извлекает название компании из запроса"""
         # Поиск по шаблонам "ООО", "ЗАО", "ОАО", "ПАО" и т.д.
-        patterns = [
-            r'ООО\s+[«"]?([^»"]+)[»"]?',
-            r'ЗАО\s+[«"]?([^»"]+)[»"]?',
-            r'ОАО\s+[«"]?([^»"]+)[»"]?',
-            r'ПАО\s+[«"]?([^»"]+)[»"]?',
-            r'ИП\s+([А-Яа-я\s]+)',
-            r'ОГРН\s+(\d{13}|\d{15})',
-            r'ИНН\s+(\d{10}|\d{12})'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, query)
+        for pattern in COMPANY_NAME_PATTERNS:
+            match = pattern.search(query)
             if match:
                 return match.group(0)
         return None
@@ -123,17 +148,9 @@ class SmartSearchService:
     def extract_document_type(self, query: str) -> Optional[str]:
         """Извлекает тип документа из запроса"""
         logger.log(f"🔎 Проверка типа документа для запроса: '{query}'", LogLevel.INFO)
-        doc_types = [
-                "исковое заявление", "иск", "претензия", "отзыв", "отзыв на исковое заявление", 
-                "ходатайство", "апелляционная жалоба", "кассационная жалоба", 
-                "заявление", "возражение", "договор", "соглашение", "жалоба", "мировое соглашение",
-                "согласие", "административное исковое заявление", "замечаение", "ответ", "приложение к исковому заявлению",
-                "расписка", "расчет", "контррасчет", "ответ на претензию", "замечания на протокол", "независимая гарантия",
-                "ответ на определение суда", "расчет исковых требований", "расчет убытков"
-            ]
-
-        for doc_type in doc_types:
-            if doc_type.lower() in query.lower():
+        query_lower = query.lower()
+        for doc_type in DOCUMENT_TYPES:
+            if doc_type in query_lower:
                 logger.log(f"🔎 Найден тип документа: '{doc_type}'", LogLevel.INFO)
                 return doc_type
         logger.log(f"🔎 Тип документа не найден", LogLevel.INFO)
@@ -412,14 +429,11 @@ def extract_case_numbers_from_query(query: str) -> List[str]:
     Returns:
         List[str]: Список вариантов номеров дел
     """
-    # Расширенный шаблон для поиска номеров дел различных форматов
-    pattern = r'[АA]\d{1,2}-\d+/\d{2,4}(?:-[А-Яа-яA-Za-z0-9]+)*'
-
     # Обеспечиваем, что текст запроса в правильной кодировке
     if isinstance(query, bytes):
         query = query.decode('utf-8')
 
-    match = re.search(pattern, query)
+    match = ARBITRATION_CASE_NUMBER_RE.search(query) if CASE_NUMBER_MARKER in query else None
 
     if not match:
         logger.log(f"Номер дела не найден в запросе: '{query}'", LogLevel.INFO)
@@ -562,9 +576,7 @@ def search_procedural_forms(query: str, limit: int = 5) -> List[str]:
             if highlight_text:
                 result += f"\nРелевантные фрагменты:\n{highlight_text}\n\n"
 
-            result += f"\nПолный текст документа:\n{full_text[:2000]}"
-            if len(full_text) > 2000:
-                result += "...[текст сокращен]"
+            result += f"\nПолный текст документа:\n{truncate_preview(full_text, suffix='...[текст сокращен]')}"
 
             results.append(result)
 
@@ -589,59 +601,138 @@ async def get_query_embedding(query: str) -> List[float]:
         List[float]: Вектор эмбеддинга размерности 384
     """
     try:
-        embedding_service = EmbeddingService()
+        # Если модель ещё грузится (фоновый прогрев при старте), ждём её вне event loop
+        embedding_service = await asyncio.to_thread(EmbeddingService)
         return await embedding_service.get_embedding_async(query)
         
     except Exception as e:
         logger.log(f"❌ Ошибка при получении эмбеддинга: {str(e)}", LogLevel.ERROR)
         return [0.0] * 384  # Возвращаем нулевой вектор в случае ошибки
 
-async def search_law_chunks(query: str, size: int = 5, use_vector: bool = True) -> List[Dict[str, Any]]:
-    logger.search("ElasticSearch", query, context={"query": query, "size": size})
-    try:
-        es = get_es_client()
-        search_query = {
-            "query": {
-                "bool": {
-                    "should": [
-                        {
-                            "multi_match": {
+LAW_CHUNKS_INDEX = "court_decisions_index"
+
+
+def build_law_chunks_query(query: str, size: int) -> Dict[str, Any]:
+    """Формирует тело полнотекстового запроса для search_law_chunks."""
+    return {
+        "query": {
+            "bool": {
+                "should": [
+                    {
+                        "multi_match": {
+                            "query": query,
+                            "fields": [
+                                "text^3",
+                                "title^2", 
+                                "content^2",
+                                "full_text^2"
+                            ],
+                            "type": "best_fields",
+                            "fuzziness": "AUTO"
+                        }
+                    },
+                    {
+                        "match_phrase": {
+                            "text": {
                                 "query": query,
-                                "fields": [
-                                    "text^3",
-                                    "title^2", 
-                                    "content^2",
-                                    "full_text^2"
-                                ],
-                                "type": "best_fields",
-                                "fuzziness": "AUTO"
-                            }
-                        },
-                        {
-                            "match_phrase": {
-                                "text": {
-                                    "query": query,
-                                    "boost": 2
-                                }
+                                "boost": 2
                             }
                         }
-                    ],
-                    "minimum_should_match": 1
-                }
-            },
-            "highlight": {
-                "fields": {
-                    "text": {"fragment_size": 150, "number_of_fragments": 3}
-                }
-            },
-            "size": size
-        }
-        logger.log(f"[ES] Отправляем запрос: {json.dumps(search_query)[:300]}...", LogLevel.DEBUG)
-        response = es.search(
-            index="court_decisions_index",
-            body=search_query
-        )
-        hits = response['hits']['hits']
+                    }
+                ],
+                "minimum_should_match": 1
+            }
+        },
+        "highlight": {
+            "fields": {
+                "text": {"fragment_size": 150, "number_of_fragments": 3}
+            }
+        },
+        "size": size
+    }
+
+
+class LawChunksBatcher:
+    """
+    Объединяет одновременные запросы search_law_chunks в один вызов _msearch.
+
+    Запросы копятся не дольше window секунд (или до max_batch штук), затем
+    уходят в Elasticsearch одним HTTP-запросом; каждый вызывающий получает
+    свои hits через Future.
+    """
+
+    def __init__(self, window: float = 0.01, max_batch: int = 16):
+        self.window = window
+        self.max_batch = max_batch
+        self._es = None
+        self._pending: List[tuple] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def search(self, query: str, size: int) -> List[Dict[str, Any]]:
+        """Ставит запрос в очередь пакета и возвращает hits из ответа ES."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((build_law_chunks_query(query, size), future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Забирает накопленные запросы и запускает их отправку."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[tuple]) -> None:
+        """Выполняет _msearch (синхронный клиент — в пуле потоков) и раздаёт ответы."""
+        searches = []
+        for body, _ in batch:
+            searches.extend([{"index": LAW_CHUNKS_INDEX}, body])
+        try:
+            if self._es is None:
+                self._es = get_es_client()
+            response = await asyncio.to_thread(self._es.msearch, searches=searches)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.log(f"[ES] _msearch: {len(batch)} запрос(ов) одним вызовом", LogLevel.DEBUG)
+        for (_, future), item in zip(batch, response["responses"]):
+            if future.done():
+                continue
+            if "error" in item:
+                future.set_exception(RuntimeError(f"Ошибка Elasticsearch: {item['error']}"))
+            else:
+                future.set_result(item["hits"]["hits"])
+
+
+# Инициализация пакетировщика запросов к ES
+_law_chunks_batcher = None
+
+def get_law_chunks_batcher() -> LawChunksBatcher:
+    """Синглтон для доступа к пакетировщику запросов search_law_chunks"""
+    global _law_chunks_batcher
+    if _law_chunks_batcher is None:
+        _law_chunks_batcher = LawChunksBatcher()
+    return _law_chunks_batcher
+
+
+async def search_law_chunks(query: str, size: int = 5, use_vector: bool = True) -> List[Dict[str, Any]]:
+    logger.search("ElasticSearch: %s", query, context={"query": query, "size": size})
+    try:
+        # Одновременные запросы разных пользователей уходят в ES одним _msearch
+        hits = await get_law_chunks_batcher().search(query, size)
         logger.info(f"Найдено {len(hits)} результатов из Elasticsearch", context={"query": query, "results_count": len(hits)})
         if hits:
             logger.log(f"[ES] Пример первого результата: {json.dumps(hits[0], ensure_ascii=False)[:500]}...", LogLevel.DEBUG)
@@ -684,8 +775,7 @@ def search_court_decisions(es, query: str, limit: int) -> List[str]:
             return []
 
         # Извлекаем номер дела из запроса с помощью регулярного выражения
-        case_number_pattern = r'[АA]\d{1,2}-\d+/\d{2,4}(?:-[А-Яа-яA-Za-z0-9]+)*'
-        case_number_matches = re.findall(case_number_pattern, query)
+        case_number_matches = ARBITRATION_CASE_NUMBER_RE.findall(query) if CASE_NUMBER_MARKER in query else []
 
         case_numbers = []
         for number in case_number_matches:
@@ -788,7 +878,7 @@ def search_court_decisions(es, query: str, limit: int) -> List[str]:
             if highlights:
                 result += f"Релевантные фрагменты:\n{highlight_text}\n\n"
 
-            result += f"Полный текст:\n{full_text[:2000]}..."
+            result += f"Полный текст:\n{truncate_preview(full_text)}"
 
             results.append(result)
 
@@ -893,7 +983,7 @@ def search_ruslawod_chunks(es, query: str, limit: int) -> List[str]:
 
             # Ограничиваем размер полного текста
             if content:
-                content_preview = content[:2000] + "..." if len(content) > 2000 else content
+                content_preview = truncate_preview(content)
                 result += f"Текст:\n{content_preview}"
 
             results.append(result)
@@ -995,7 +1085,7 @@ def search_court_reviews(es, query: str, limit: int) -> List[str]:
 
             # Ограничиваем размер полного текста
             if content:
-                content_preview = content[:2000] + "..." if len(content) > 2000 else content
+                content_preview = truncate_preview(content)
                 result += f"Содержание:\n{content_preview}"
 
             results.append(result)
@@ -1101,7 +1191,7 @@ def search_legal_articles(es, query: str, limit: int) -> List[str]:
 
             # Ограничиваем размер полного текста
             if content:
-                content_preview = content[:2000] + "..." if len(content) > 2000 else content
+                content_preview = truncate_preview(content)
                 result += f"Содержание:\n{content_preview}"
 
             results.append(result)
@@ -1434,9 +1524,9 @@ def update_all_mappings():
         logger.log(f"❌ Ошибка при обновлении маппингов: {str(e)}", LogLevel.ERROR)
         return False
 
-def search_law_chunks_multi(queries: list[str], size: int = 5) -> list[dict]:
+async def search_law_chunks_multi(queries: list[str], size: int = 5) -> list[dict]:
     """
-    Выполняет поиск по нескольким запросам в Elasticsearch и объединяет результаты.
+    Выполняет поиск по нескольким запросам в Elasticsearch одновременно и объединяет результаты.
     Args:
         queries: Список поисковых запросов
         size: Количество результатов на каждый запрос
@@ -1445,8 +1535,15 @@ def search_law_chunks_multi(queries: list[str], size: int = 5) -> list[dict]:
     """
     all_results = []
     seen = set()
-    for q in queries:
-        results = search_law_chunks(q, size)
+    # Ошибка одного запроса не должна отменять остальные; порядок запросов сохраняется
+    results_per_query = await asyncio.gather(
+        *(search_law_chunks(q, size) for q in queries),
+        return_exceptions=True
+    )
+    for query, results in zip(queries, results_per_query):
+        if isinstance(results, Exception):
+            logger.log(f"❌ Ошибка поиска по запросу '{query}': {results}", LogLevel.ERROR)
+            continue
         for r in results:
             # Уникальность по тексту и заголовку
             key = (r.get("text", "")[:100], r.get("title", ""))
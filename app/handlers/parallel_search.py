@@ -4,12 +4,34 @@ from app.handlers.es_law_search import search_law_chunks
 import asyncio
 import re
 import chardet
-from app.services.tavily_service import TavilyService
+from app.services.tavily_service import get_tavily_service
 from app.utils.logger import get_logger, LogLevel
 
 # Инициализируем logger
 logger = get_logger()
 
+# Кириллица в URL-кодировке (%D0%xx): один проход декодирует и одиночные буквы, и их цепочки
+URL_ENCODED_CYRILLIC_RE = re.compile(r'%D0%[89AB][0-9A-F]')
+
+# Кириллица, прочитанная как Latin-1 ("Ð°" вместо "а")
+MOJIBAKE_REPLACEMENTS = {
+    'Ð°': 'а', 'Ð±': 'б', 'Ð²': 'в', 'Ð³': 'г', 'Ð´': 'д',
+    'Ðµ': 'е', 'Ñ\x91': 'ё', 'Ñ‘': 'ё', 'Ð¶': 'ж', 'Ð·': 'з', 'Ð¸': 'и',
+    'Ð¹': 'й', 'Ðº': 'к', 'Ð»': 'л', 'Ð¼': 'м', 'Ð½': 'н',
+    'Ð¾': 'о', 'Ð¿': 'п', 'Ñ€': 'р', 'Ñ\x81': 'с', 'Ñ‚': 'т',
+    'Ñƒ': 'у', 'Ñ„': 'ф', 'Ñ…': 'х', 'Ñ†': 'ц', 'Ñ‡': 'ч',
+    'Ñˆ': 'ш', 'Ñ‰': 'щ', 'ÑŠ': 'ъ', 'Ñ‹': 'ы', 'ÑŒ': 'ь',
+    'Ñ\x8d': 'э', 'ÑŽ': 'ю', 'Ñ\x8f': 'я'
+}
+# Длинные последовательности проверяются раньше своих префиксов ("Ñ€" раньше "Ñ")
+MOJIBAKE_RE = re.compile("|".join(
+    re.escape(wrong) for wrong in sorted(MOJIBAKE_REPLACEMENTS, key=len, reverse=True)
+))
+# Управляющие символы (кроме \t, \n, \r) удаляются через str.translate, без регулярного выражения
+CONTROL_CHARS_TABLE = dict.fromkeys(
+    [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), *range(0x7F, 0xA0)]
+)
+
 def ensure_correct_encoding(text: str) -> str:
     """
     Проверяет и исправляет кодировку текста, обеспечивая UTF-8.
@@ -27,33 +49,18 @@ def ensure_correct_encoding(text: str) -> str:
     if isinstance(text, str):
         try:
             # Пробуем сначала исправить кириллицу в URL-кодировке
-            text = re.sub(r'%D0%[89AB][0-9A-F]%D0%[89AB][0-9A-F]', 
-                         lambda m: bytes.fromhex(m.group(0).replace('%', '')).decode('utf-8'), 
-                         text)
-            text = re.sub(r'%D0%[89AB][0-9A-F]', 
-                         lambda m: bytes.fromhex(m.group(0).replace('%', '')).decode('utf-8'), 
-                         text)
-            
-            # Исправляем неправильно декодированные символы
-            replacements = {
-                'Ð°': 'а', 'Ð±': 'б', 'Ð²': 'в', 'Ð³': 'г', 'Ð´': 'д',
-                'Ðµ': 'е', 'Ñ': 'ё', 'Ð¶': 'ж', 'Ð·': 'з', 'Ð¸': 'и',
-                'Ð¹': 'й', 'Ðº': 'к', 'Ð»': 'л', 'Ð¼': 'м', 'Ð½': 'н',
-                'Ð¾': 'о', 'Ð¿': 'п', 'Ñ€': 'р', 'Ñ': 'с', 'Ñ‚': 'т',
-                'Ñƒ': 'у', 'Ñ„': 'ф', 'Ñ…': 'х', 'Ñ†': 'ц', 'Ñ‡': 'ч',
-                'Ñˆ': 'ш', 'Ñ‰': 'щ', 'ÑŠ': 'ъ', 'Ñ‹': 'ы', 'ÑŒ': 'ь',
-                'Ñ': 'э', 'Ñž': 'ю', 'Ñ': 'я'
-            }
+            text = URL_ENCODED_CYRILLIC_RE.sub(
+                lambda m: bytes.fromhex(m.group(0).replace('%', '')).decode('utf-8'),
+                text)
             
-            # Применяем все замены
-            for wrong, correct in replacements.items():
-                text = text.replace(wrong, correct)
+            # Исправляем неправильно декодированные символы за один проход
+            text = MOJIBAKE_RE.sub(lambda m: MOJIBAKE_REPLACEMENTS[m.group(0)], text)
             
             # Пробуем перекодировать через bytes для исправления возможных проблем
             text = text.encode('utf-8', errors='ignore').decode('utf-8')
             
             # Удаляем оставшиеся проблемные символы и нормализуем пробелы
-            text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', '', text)
+            text = text.translate(CONTROL_CHARS_TABLE)
             text = re.sub(r'\s+', ' ', text)
             
             return text.strip()
@@ -86,7 +93,7 @@ def ensure_correct_encoding(text: str) -> str:
 async def run_parallel_search(query: str, limit: int = 5) -> Dict[str, Any]:
     """Выполняет параллельный поиск по всем источникам и возвращает словарь с результатами."""
     try:
-        tavily_service = TavilyService()
+        tavily_service = get_tavily_service()
         es_results, tavily_results = await asyncio.gather(
             search_law_chunks(query, limit),
             tavily_service.search(query, limit)
@@ -108,7 +115,7 @@ async def search_tavily(query: str) -> List[Dict[str, Any]]:
     """
     logging.info(f"🔍 Начало поиска в Tavily по запросу: '{query}'")
     try:
-        tavily_service = TavilyService()
+        tavily_service = get_tavily_service()
         results = await tavily_service.search(query, max_results=5)
         if not isinstance(results, list):
             logging.warning(f"Tavily: неожиданный тип результата: {type(results)}")
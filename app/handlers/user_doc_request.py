@@ -4,11 +4,16 @@ import logging
 import time
 import re
 import asyncio
+import hashlib
 import json
 import aiofiles
 import mimetypes
 import tempfile
 import shutil
+import uuid
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Tuple, List, Dict, Optional, Any, Union
 from sqlalchemy.orm import Session
@@ -60,9 +65,10 @@ except Exception as e:
 UPLOAD_FOLDER = "uploads"
 TEMP_FOLDER = "temp_processing"  # Используется для временных файлов
 OUTPUT_FOLDER = "output_documents"  # Папка для сохранения распознанных файлов
+DOC_CACHE_FOLDER = os.path.join(TEMP_FOLDER, "doc_cache")  # Кэш извлечённого текста по SHA-256 содержимого
 
 # Создаем необходимые директории при импорте модуля
-for folder in [UPLOAD_FOLDER, TEMP_FOLDER, OUTPUT_FOLDER]:
+for folder in [UPLOAD_FOLDER, TEMP_FOLDER, OUTPUT_FOLDER, DOC_CACHE_FOLDER]:
     if not os.path.exists(folder):
         try:
             os.makedirs(folder, exist_ok=True)
@@ -73,6 +79,7 @@ for folder in [UPLOAD_FOLDER, TEMP_FOLDER, OUTPUT_FOLDER]:
 # Константы
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 МБ максимальный размер файла
 SUPPORTED_EXTENSIONS = ['.pdf', '.doc', '.docx', '.xlsx', '.jpeg', '.jpg', '.tiff', '.tif']
+DOC_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 ГБ: сверх лимита удаляются давно не использованные записи
 
 # Словарь для ручной транслитерации
 MANUAL_TRANSLIT_MAP = {
@@ -89,6 +96,13 @@ MANUAL_TRANSLIT_MAP = {
     ' ': '_', '-': '-', '.': '.'  # Добавляем разрешенные символы и замену пробелов
 }
 
+# Регулярные выражения для имён файлов и MIME-типов компилируются один раз
+MULTIPLE_UNDERSCORES_RE = re.compile(r'_{2,}')
+TIMESTAMP_PREFIX_RE = re.compile(r'^\d{8}_\d{6}_(?:[0-9a-f]{8}_)?')
+VALID_DOCX_MIMES_RE = re.compile(
+    r"application/vnd\.openxmlformats-officedocument\.wordprocessingml\.document|application/msword|application/octet-stream"
+)
+
 def safe_filename(filename: str) -> str:
     """
     Создает безопасное для файловой системы имя из строки, транслитерируя
@@ -120,14 +134,13 @@ def safe_filename(filename: str) -> str:
     safe_name = ''.join(c if c.isalnum() or c in '_-.' else '_' for c in transliterated_name)
 
     # Убедимся, что не начинается или заканчивается на _ или . (кроме расширения)
-    safe_name = re.sub(r'^[_.]+', '', safe_name)
-    safe_name = re.sub(r'[_.]+$', '', safe_name)
+    safe_name = safe_name.strip('_.')
 
     # Замена множественных подчеркиваний одним
-    safe_name = re.sub(r'_{2,}', '_', safe_name)
+    safe_name = MULTIPLE_UNDERSCORES_RE.sub('_', safe_name)
 
     # Удаляем временные метки из имени файла для удобства пользователя
-    safe_name = re.sub(r'^\d{8}_\d{6}_', '', safe_name)
+    safe_name = TIMESTAMP_PREFIX_RE.sub('', safe_name)
 
     if not safe_name:  # Если после очистки имя стало пустым
         safe_name = "document"
@@ -152,6 +165,122 @@ def is_valid_docx_sync(file_path):
         return False
 
 
+def read_cached_text_sync(digest: str) -> Optional[str]:
+    """
+    Возвращает ранее извлечённый текст документа по SHA-256 его содержимого или None.
+    Синхронная функция; при попадании обновляет mtime записи для вытеснения по давности.
+    """
+    cache_path = os.path.join(DOC_CACHE_FOLDER, f"{digest}.txt")
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None
+    os.utime(cache_path)
+    return text
+
+
+def write_cached_text_sync(digest: str, text: str) -> None:
+    """
+    Атомарно (запись во временный файл и os.replace) сохраняет текст в кэш документов
+    и удаляет самые давно использованные записи, если кэш превысил DOC_CACHE_MAX_BYTES.
+    Синхронная функция.
+    """
+    cache_path = os.path.join(DOC_CACHE_FOLDER, f"{digest}.txt")
+    # Уникальное имя временного файла: одновременные записи из разных потоков не пересекаются
+    fd, tmp_path = tempfile.mkstemp(dir=DOC_CACHE_FOLDER, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    entries = []
+    total_size = 0
+    with os.scandir(DOC_CACHE_FOLDER) as it:
+        for entry in it:
+            if entry.name.endswith('.txt'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+    if total_size <= DOC_CACHE_MAX_BYTES:
+        return
+    for _, size, path in sorted(entries):
+        if total_size <= DOC_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def write_text_file_sync(txt_file_path: str, full_content: str) -> bool:
+    """
+    Надёжно записывает текст в файл (через временный файл, с fsync и проверкой размера).
+    Синхронная функция. Возвращает True, если файл записан полностью.
+    """
+    try:
+        # Логируем информацию о тексте перед сохранением
+        logging.info(f"📊 Текст для сохранения: {len(full_content)} символов")
+        
+        # Используем прямую бинарную запись для максимальной надежности
+        content_bytes = full_content.encode('utf-8')
+        
+        # Всегда используем метод с временным файлом для надежности
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.txt') as temp_file:
+            temp_path = temp_file.name
+            temp_file.write(content_bytes)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        
+        # Копируем временный файл на место целевого после успешной записи
+        shutil.copy2(temp_path, txt_file_path)
+        
+        # Проверка успешности записи
+        file_size = os.path.getsize(txt_file_path)
+        expected_size = len(content_bytes)
+        saved = file_size == expected_size
+        
+        if saved:
+            logging.info(f"✅ Полный текст успешно сохранен: {file_size}/{expected_size} байт")
+            logging.info(f"✅ Результат сохранен в TXT: {txt_file_path} (размер: {file_size} байт)")
+        else:
+            logging.error(f"❌ Неполная запись: ожидалось {expected_size} байт, записано {file_size} байт")
+            
+            # Еще одна попытка с прямой записью
+            with open(txt_file_path, "wb") as f:
+                f.write(content_bytes)
+                f.flush()
+                os.fsync(f.fileno())
+                
+            # Проверяем размер снова
+            new_size = os.path.getsize(txt_file_path)
+            saved = new_size == expected_size
+            if saved:
+                logging.info(f"✅ Успешно сохранен полный текст: {new_size}/{expected_size} байт")
+                logging.info(f"✅ Результат сохранен в TXT: {txt_file_path} (размер: {new_size} байт)")
+            else:
+                logging.error(f"❌ Не удалось сохранить полный текст: {new_size}/{expected_size} байт")
+        
+        # Удаляем временный файл
+        try:
+            os.unlink(temp_path)
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось удалить временный файл {temp_path}: {e}")
+        
+        return saved
+    
+    except Exception as e:
+        logging.error(f"❌ Ошибка при сохранении текста в файл: {e}")
+        raise
+
+
 async def convert_doc_to_docx_async(doc_file_path: str) -> str:
     """
     Конвертирует .doc в .docx с помощью LibreOffice в отдельном потоке.
@@ -238,8 +367,7 @@ async def extract_text_from_docx_async(file_path: str) -> str:
             file_type = await asyncio.to_thread(mime.from_file, docx_file_path_to_read)
 
             # Проверяем MIME, но не делаем критическую ошибку, если ZIP-заголовок OK
-            valid_mimes_pattern = r"application/vnd\.openxmlformats-officedocument\.wordprocessingml\.document|application/msword|application/octet-stream"
-            if not re.match(valid_mimes_pattern, file_type):
+            if not VALID_DOCX_MIMES_RE.match(file_type):
                 logging.warning(f"⚠️ MIME-тип файла {os.path.basename(file_path)} ({file_type}) не соответствует ожидаемым для DOCX/DOC, но ZIP-заголовок корректен. Попробуем извлечь текст.")
 
         except ImportError:
@@ -301,41 +429,43 @@ async def extract_text_from_xlsx_async(file_path):
         excel_data = await asyncio.to_thread(pd.ExcelFile, file_path)
         sheets = await asyncio.to_thread(lambda x: x.sheet_names, excel_data)  # Вызов свойства в потоке
 
-        extracted_text = f"Excel-документ содержит {len(sheets)} листов:\n\n"
+        # Части текста копим в списке и склеиваем один раз в конце
+        parts = [f"Excel-документ содержит {len(sheets)} листов:\n\n"]
 
         for sheet_name in sheets:
             try:
                 # pandas.read_excel может быть блокирующим
                 df = await asyncio.to_thread(pd.read_excel, excel_data, sheet_name)
-                sheet_text = f"== Лист: {sheet_name} ==\n"
+                sheet_parts = [f"== Лист: {sheet_name} ==\n"]
 
                 # Получаем размер таблицы
                 rows, cols = df.shape
-                sheet_text += f"Размер таблицы: {rows} строк x {cols} столбцов\n\n"
+                sheet_parts.append(f"Размер таблицы: {rows} строк x {cols} столбцов\n\n")
 
                 # Добавляем заголовки столбцов
                 headers = df.columns.tolist()
-                sheet_text += "ЗАГОЛОВКИ: " + " | ".join(str(h)
-                                                        for h in headers) + "\n\n"
+                sheet_parts.append("ЗАГОЛОВКИ: " + " | ".join(str(h) for h in headers) + "\n\n")
 
                 # Добавляем данные (ограничиваем количество строк)
                 max_rows = min(50, rows)  # Ограничиваем до 50 строк
                 for i in range(max_rows):
                     row_data = df.iloc[i].tolist()
-                    sheet_text += "СТРОКА " + str(i + 1) + ": " + " | ".join(
-                        str(cell) if pd.notna(cell) else "" for cell in row_data) + "\n"  # Обработка NaN/None
+                    sheet_parts.append("СТРОКА " + str(i + 1) + ": " + " | ".join(
+                        str(cell) if pd.notna(cell) else "" for cell in row_data) + "\n")  # Обработка NaN/None
 
                 if rows > max_rows:
-                    sheet_text += f"\n... [и ещё {rows - max_rows} строк не показаны]\n"
+                    sheet_parts.append(f"\n... [и ещё {rows - max_rows} строк не показаны]\n")
 
-                extracted_text += sheet_text + "\n\n"
+                sheet_parts.append("\n\n")
+                parts.extend(sheet_parts)
             except pd.errors.EmptyDataError:
-                sheet_text = f"== Лист: {sheet_name} ==\nЛист пуст.\n\n"
-                extracted_text += sheet_text
+                parts.append(f"== Лист: {sheet_name} ==\nЛист пуст.\n\n")
                 logging.warning(f"⚠️ Лист '{sheet_name}' в Excel файле пуст.")
             except Exception as sheet_e:
                 logging.error(f"❌ Ошибка при обработке листа '{sheet_name}': {sheet_e}")
-                extracted_text += f"== Лист: {sheet_name} ==\nОшибка при обработке листа: {sheet_e}\n\n"
+                parts.append(f"== Лист: {sheet_name} ==\nОшибка при обработке листа: {sheet_e}\n\n")
+
+        extracted_text = "".join(parts)
 
         elapsed_time = time.time() - start_time
         logging.info(f"✅ Excel обработан за {elapsed_time:.2f} секунд")
@@ -353,6 +483,59 @@ async def extract_text_from_xlsx_async(file_path):
         raise ValueError(f"Непредвиденная ошибка при обработке Excel файла: {str(e)}")
 
 
+# Текстовый слой PyMuPDF извлекается на CPU под GIL, поэтому диапазоны страниц
+# больших PDF обрабатываются в отдельных процессах (не больше 6: дальше растут накладные расходы)
+PDF_PARALLEL_MIN_PAGES = 8
+PDF_MAX_WORKERS = min(os.cpu_count() or 1, 6)
+
+# Общий пул процессов создаётся при первом большом PDF. Процессы запускаются через spawn:
+# fork многопоточного процесса сервера может унаследовать захваченные блокировки
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Возвращает общий пул процессов для разбора PDF, создавая его при первом вызове."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_pool
+
+
+def shutdown_pdf_pool() -> None:
+    """Останавливает общий пул процессов (вызывается при остановке приложения)."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=True)
+            _pdf_pool = None
+
+
+def extract_pdf_text_sync(pdf_path: str) -> str:
+    """
+    Извлекает текстовый слой PDF через PyMuPDF. Синхронная функция.
+    Если на каждый процесс приходится не меньше PDF_PARALLEL_MIN_PAGES страниц,
+    документ делится на диапазоны страниц и разбирается в общем пуле процессов.
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+        workers = min(PDF_MAX_WORKERS, page_count // PDF_PARALLEL_MIN_PAGES)
+        if workers < 2:
+            # Текст страниц собираем одним join, без повторного копирования строки
+            return "".join(page.get_text() for page in doc)
+
+    step = -(-page_count // workers)  # деление с округлением вверх
+    starts = range(0, page_count, step)
+    stops = [min(start + step, page_count) for start in starts]
+    # Импорт по месту: pdf_worker требует PyMuPDF, который может быть не установлен
+    from pdf_worker import extract_pdf_pages_sync
+    return "".join(get_pdf_pool().map(extract_pdf_pages_sync, [pdf_path] * len(starts), starts, stops))
+
+
 async def extract_text_from_pdf_async(file_path: str) -> str:
     """
     Извлекает текст из PDF. Использует Gemini для OCR (сканы) и PyMuPDF
@@ -387,16 +570,7 @@ async def extract_text_from_pdf_async(file_path: str) -> str:
         # Извлекаем текст напрямую через PyMuPDF (в отдельном потоке)
         if fitz:
             try:
-                def get_text_sync(pdf_path):
-                    doc = fitz.open(pdf_path)
-                    text = ""
-                    for page_num in range(len(doc)):
-                        page = doc[page_num]
-                        text += page.get_text()
-                    doc.close()
-                    return text
-
-                text = await asyncio.to_thread(get_text_sync, file_path)
+                text = await asyncio.to_thread(extract_pdf_text_sync, file_path)
 
                 if text.strip():
                     logging.info(f"✅ Текст успешно извлечен из PDF с помощью PyMuPDF. Символов: {len(text)}")
@@ -552,6 +726,20 @@ async def cleanup_file(file_path: str):
             logging.error(f"❌ Не удалось удалить файл {file_path}: {e}")
 
 
+# Асинхронный метод извлечения текста по расширению файла (в нижнем регистре)
+DOCUMENT_EXTRACTORS = {
+    ".pdf": extract_text_from_pdf_async,
+    # extract_text_from_docx_async управляет конвертацией и очисткой временного файла .doc -> .docx
+    ".doc": extract_text_from_docx_async,
+    ".docx": extract_text_from_docx_async,
+    ".xlsx": extract_text_from_xlsx_async,
+    ".jpg": extract_text_from_image_async,
+    ".jpeg": extract_text_from_image_async,
+    ".tif": extract_text_from_image_async,
+    ".tiff": extract_text_from_image_async,
+}
+
+
 async def extract_text_from_any_document(file_path: str) -> Tuple[str, Dict[str, Any]]:
     """
     Универсальная функция извлечения текста из различных типов документов.
@@ -609,16 +797,8 @@ async def extract_text_from_any_document(file_path: str) -> Tuple[str, Dict[str,
         logging.info(f"🔍 Начинаем извлечение текста из {ext} файла: {file_path}")
 
         # Выбираем подходящий асинхронный метод извлечения по расширению
-        if ext == ".pdf":
-            extracted_text = await extract_text_from_pdf_async(file_path)
-        elif ext in [".doc", ".docx"]:
-            # extract_text_from_docx_async управляет конвертацией и очисткой временного файла .doc -> .docx
-            extracted_text = await extract_text_from_docx_async(file_path)
-        elif ext == ".xlsx":
-            extracted_text = await extract_text_from_xlsx_async(file_path)
-        elif ext in [".jpg", ".jpeg", ".tif", ".tiff"]:
-            extracted_text = await extract_text_from_image_async(file_path)
-        else:
+        extractor = DOCUMENT_EXTRACTORS.get(ext)
+        if extractor is None:
             error_message = (
                 f"Неподдерживаемый тип файла: {ext}. "
                 f"Поддерживаются: {', '.join(SUPPORTED_EXTENSIONS)}"
@@ -627,6 +807,8 @@ async def extract_text_from_any_document(file_path: str) -> Tuple[str, Dict[str,
             # Возвращаем ошибку в тексте, не бросаем HTTPException здесь
             return error_message, local_file_metadata
 
+        extracted_text = await extractor(file_path)
+
         # Проверяем, является ли результат текстом ошибки от под-функций
         if extracted_text and extracted_text.startswith("Не удалось извлечь текст из"):
             error_message = extracted_text  # Сохраняем сообщение об ошибке
@@ -670,7 +852,8 @@ async def extract_text_from_any_document(file_path: str) -> Tuple[str, Dict[str,
             original_filename = os.path.basename(file_path)
             safe_base_name = safe_filename(original_filename)  # safe_filename уже добавляет расширение
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            processed_at = datetime.now()
+            timestamp = processed_at.strftime("%Y%m%d_%H%M%S")
             output_base_filename = f"{timestamp}_{os.path.splitext(safe_base_name)[0]}"
 
             # Создаем более понятное имя файла на основе оригинального, без технических префиксов
@@ -693,7 +876,7 @@ async def extract_text_from_any_document(file_path: str) -> Tuple[str, Dict[str,
             try:
                 # Добавляем заголовок для улучшения читаемости
                 header = f"Распознанный текст документа: {safe_original_name}\n"
-                header += f"Дата обработки: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n"
+                header += f"Дата обработки: {processed_at.strftime('%d.%m.%Y %H:%M:%S')}\n"
                 header += "=" * 50 + "\n\n"
                 
                 # Полное содержимое с заголовком
@@ -703,65 +886,11 @@ async def extract_text_from_any_document(file_path: str) -> Tuple[str, Dict[str,
                 logging.info(f"Сохраняемый текст: Длина={len(content_to_save)} символов, Заголовок={len(header)} символов")
                 logging.info(f"Общая длина текста для сохранения: {len(full_content)} символов")
                 
-                # Сначала записываем данные в бинарном режиме для гарантии сохранения всех данных
-                try:
-                    # Логируем информацию о тексте перед сохранением
-                    logging.info(f"📊 Текст для сохранения: {len(full_content)} символов")
-                    
-                    # Используем прямую бинарную запись для максимальной надежности
-                    content_bytes = full_content.encode('utf-8')
-                    
-                    # Всегда используем метод с временным файлом для надежности
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.txt') as temp_file:
-                        temp_path = temp_file.name
-                        temp_file.write(content_bytes)
-                        temp_file.flush()
-                        os.fsync(temp_file.fileno())
-                    
-                    # Копируем временный файл на место целевого после успешной записи
-                    shutil.copy2(temp_path, txt_file_path)
-                    
-                    # Проверка успешности записи
-                    file_size = os.path.getsize(txt_file_path)
-                    expected_size = len(content_bytes)
-                    
-                    if file_size == expected_size:
-                        logging.info(f"✅ Полный текст успешно сохранен: {file_size}/{expected_size} байт")
-                        
-                        # Добавляем информацию о файле в метаданные
-                        local_file_metadata["recognized_text_file_txt"] = txt_file_path
-                        local_file_metadata["download_url"] = f"/api/download/{os.path.basename(txt_file_path)}"
-                        logging.info(f"✅ Результат сохранен в TXT: {txt_file_path} (размер: {file_size} байт)")
-                    else:
-                        logging.error(f"❌ Неполная запись: ожидалось {expected_size} байт, записано {file_size} байт")
-                        
-                        # Еще одна попытка с прямой записью
-                        with open(txt_file_path, "wb") as f:
-                            f.write(content_bytes)
-                            f.flush()
-                            os.fsync(f.fileno())
-                            
-                        # Проверяем размер снова
-                        new_size = os.path.getsize(txt_file_path)
-                        if new_size == expected_size:
-                            logging.info(f"✅ Успешно сохранен полный текст: {new_size}/{expected_size} байт")
-                            
-                            # Добавляем информацию о файле в метаданные
-                            local_file_metadata["recognized_text_file_txt"] = txt_file_path
-                            local_file_metadata["download_url"] = f"/api/download/{os.path.basename(txt_file_path)}"
-                            logging.info(f"✅ Результат сохранен в TXT: {txt_file_path} (размер: {new_size} байт)")
-                        else:
-                            logging.error(f"❌ Не удалось сохранить полный текст: {new_size}/{expected_size} байт")
-                    
-                    # Удаляем временный файл
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        logging.warning(f"⚠️ Не удалось удалить временный файл {temp_path}: {e}")
-                
-                except Exception as e:
-                    logging.error(f"❌ Ошибка при сохранении текста в файл: {e}")
-                    raise
+                # Запись с fsync и копированием блокирует, поэтому выполняется в пуле потоков
+                if await asyncio.to_thread(write_text_file_sync, txt_file_path, full_content):
+                    # Добавляем информацию о файле в метаданные
+                    local_file_metadata["recognized_text_file_txt"] = txt_file_path
+                    local_file_metadata["download_url"] = f"/api/download/{os.path.basename(txt_file_path)}"
                 
             except Exception as e:
                 logging.error(f"❌ Ошибка при сохранении результата: {e}")
@@ -791,6 +920,8 @@ async def process_uploaded_file(file: UploadFile, user_id: Optional[int] = None,
         Tuple[str, str, Dict[str, Any]]: (путь к файлу, извлеченный текст, метаданные)
     """
     start_time = time.time()
+    # Время загрузки берём один раз: для метаданных, имени файла и записи в БД
+    uploaded_at = datetime.now()
     original_file_path = None
 
     # Словарь для хранения метаданных файла
@@ -806,7 +937,7 @@ async def process_uploaded_file(file: UploadFile, user_id: Optional[int] = None,
         "page_count": 0,
         "recognized_text_file_txt": None,
         "download_url": None,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": uploaded_at.isoformat()
     }
 
     try:
@@ -818,8 +949,10 @@ async def process_uploaded_file(file: UploadFile, user_id: Optional[int] = None,
         if file_extension not in SUPPORTED_EXTENSIONS:
             raise HTTPException(status_code=415, detail=f"Неподдерживаемый тип файла: {file_extension}")
 
-        # Генерируем безопасное имя для сохранения оригинального файла
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Генерируем безопасное имя для сохранения оригинального файла.
+        # Метка времени с точностью до секунды не уникальна: одноимённые файлы,
+        # загруженные одновременно, перезаписали бы друг друга — добавляем случайный суффикс
+        timestamp = f"{uploaded_at.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         safe_original_filename = safe_filename(file.filename)
         saved_filename = f"{timestamp}_{safe_original_filename}"
         original_file_path = os.path.join(UPLOAD_FOLDER, saved_filename)
@@ -843,9 +976,24 @@ async def process_uploaded_file(file: UploadFile, user_id: Optional[int] = None,
         async with aiofiles.open(original_file_path, "wb") as buffer:
             await buffer.write(file_content)
 
-        # Извлекаем текст
-        extracted_text, extraction_metadata = await extract_text_from_any_document(original_file_path)
-        file_metadata.update(extraction_metadata)
+        # Извлекаем текст: повторно загруженный документ берём из кэша по хешу содержимого
+        content_digest = hashlib.sha256(file_content).hexdigest()
+        extracted_text = await asyncio.to_thread(read_cached_text_sync, content_digest)
+        if extracted_text is not None:
+            logging.info(f"📦 Текст документа взят из кэша: {content_digest}")
+            file_metadata.update({
+                "extraction_success": True,
+                "char_count": len(extracted_text),
+                "word_count": len(extracted_text.split())
+            })
+        else:
+            extracted_text, extraction_metadata = await extract_text_from_any_document(original_file_path)
+            file_metadata.update(extraction_metadata)
+            if extraction_metadata.get("extraction_success"):
+                try:
+                    await asyncio.to_thread(write_cached_text_sync, content_digest, extracted_text)
+                except Exception as e:
+                    logging.warning(f"⚠️ Не удалось сохранить текст в кэш документов: {e}")
 
         # Сохраняем распознанный текст в файл
         if extracted_text:
@@ -866,7 +1014,7 @@ async def process_uploaded_file(file: UploadFile, user_id: Optional[int] = None,
                 file_path=original_file_path,
                 document_name=file.filename,
                 document_url=file_metadata["download_url"],
-                uploaded_at=datetime.now()
+                uploaded_at=uploaded_at
             )
             db.add(document)
             try:
@@ -3,32 +3,46 @@
 Выполняет поиск через Tavily API с оптимизацией через DeepSeek.
 """
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.utils import ensure_correct_encoding
 from app.models.scraping import ScrapedContent
-from app.services.tavily_service import TavilyService
+from app.services.tavily_service import TavilyService, get_tavily_service
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+# Логгер модуля; корневой логгер настраивается точкой входа приложения
 logger = logging.getLogger(__name__)
 
 # Константы для ограничения количества ссылок
 MAX_SEARCH_RESULTS = 10  # Максимальное количество ссылок для поиска
 MAX_SCRAPE_RESULTS = 10   # Максимальное количество ссылок для скрейпинга
 
-async def run_multiple_searches(query: str, logs: List[str]) -> Dict[str, List[Dict]]:
+def normalize_query(query: str) -> str:
+    """
+    Проверяет кодировку запроса, пропуская ASCII-строки без escape-последовательностей:
+    для них ensure_correct_encoding всегда возвращает строку без изменений.
+    """
+    if query.isascii() and '\\' not in query:
+        return query
+    return ensure_correct_encoding(query)
+
+async def run_multiple_searches(
+    query: str,
+    logs: List[str],
+    tavily_service: Optional[TavilyService] = None
+) -> Dict[str, List[Dict]]:
     """
     Выполняет поиск с использованием Tavily API.
     
     Args:
         query: Поисковый запрос
         logs: Список для логирования
+        tavily_service: Экземпляр TavilyService (по умолчанию общий)
         
     Returns:
         Dict[str, List[Dict]]: Результаты поиска
     """
     try:
-        tavily_service = TavilyService()
+        tavily_service = tavily_service or get_tavily_service()
+        query = normalize_query(query)
         
         # Выполняем поиск через Tavily
         results = await tavily_service.search(query, max_results=MAX_SEARCH_RESULTS)
@@ -53,8 +67,8 @@ class WebSearchHandler:
     """
     Обработчик для выполнения поисковых запросов с оптимизацией.
     """
-    def __init__(self):
-        self.tavily_service = TavilyService()
+    def __init__(self, tavily_service: Optional[TavilyService] = None):
+        self.tavily_service = tavily_service or get_tavily_service()
         
     async def search_and_scrape(self, query: str, logs: list, max_results: int = MAX_SCRAPE_RESULTS) -> list:
         """
@@ -70,7 +84,7 @@ class WebSearchHandler:
         """
         try:
             # Проверяем кодировку запроса
-            query = ensure_correct_encoding(query)
+            query = normalize_query(query)
             
             # Выполняем улучшенный поиск
             results = await self.tavily_service.search(query, max_results=max_results)
@@ -112,6 +126,7 @@ class WebSearchHandler:
             List[ScrapedContent]: Список результатов поиска
         """
         try:
+            query = normalize_query(query)
             results = await self.tavily_service.search(query, max_results=max_results)
             if not isinstance(results, list):
                 logging.warning(f"Tavily: неожиданный тип результата: {type(results)}")
@@ -1,10 +1,15 @@
+import asyncio
 from .scraping import ScrapedContent
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Index, func, and_, or_, insert, text
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
 from typing import List, Dict, Optional
 from fastapi import HTTPException
 
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Приводит email к каноническому виду (без пробелов, в нижнем регистре)."""
+    return email.strip().lower() if email else email
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -14,25 +19,80 @@ class User(Base):
     last_name = Column(String(100))
     is_active = Column(Boolean, default=False)
     is_verified = Column(Boolean, default=False)
+    verification_code = relationship("VerificationCode", back_populates="user", uselist=False)
     threads = relationship("Thread", back_populates="user")
     documents = relationship("Document", back_populates="user")
 
+    @validates('email')
+    def _normalize_email(self, key, value):
+        return normalize_email(value)
+
+class VerificationCode(Base):
+    __tablename__ = "verification_codes"
+    __table_args__ = (
+        # Проверка кода: WHERE user_id = ? AND code = ? AND is_used = false
+        Index('ix_vcode_user_active', 'user_id', 'code', postgresql_where=text('is_used = false')),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    code = Column(Integer, nullable=False)
+    is_used = Column(Boolean, default=False)
+    user = relationship("User", back_populates="verification_code")
+
+class TempUser(Base):
+    __tablename__ = "temp_users"
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String(255), unique=True, index=True, nullable=False)
+    hashed_password = Column(String(255), nullable=False)
+    first_name = Column(String(50), nullable=False)
+    last_name = Column(String(50), nullable=False)
+    code = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
+
+    @validates('email')
+    def _normalize_email(self, key, value):
+        return normalize_email(value)
+
+class PasswordReset(Base):
+    __tablename__ = "password_resets"
+    __table_args__ = (
+        # Подтверждение сброса: WHERE email = ? AND code = ? AND is_used = false
+        Index('ix_preset_email_code', 'email', 'code'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String(255), unique=False, index=True)
+    code = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
+    is_used = Column(Boolean, default=False)
+
+    @validates('email')
+    def _normalize_email(self, key, value):
+        return normalize_email(value)
+
 class Thread(Base):
     __tablename__ = "threads"
+    __table_args__ = (
+        # Список тредов пользователя: WHERE user_id = ? ORDER BY created_at
+        Index('ix_threads_user_created', 'user_id', 'created_at'),
+    )
     id = Column(String(50), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     first_message = Column(Text, nullable=True)
     user = relationship("User", back_populates="threads")
     messages = relationship("Message", back_populates="thread")
 
 class Message(Base):
     __tablename__ = "messages"
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = (
+        # История треда: WHERE thread_id = ? ORDER BY created_at
+        Index('ix_messages_thread_created', 'thread_id', 'created_at'),
+    )
+    id = Column(Integer, primary_key=True)
     thread_id = Column(String(50), ForeignKey("threads.id"), nullable=False)
     role = Column(String(10), nullable=False)
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     thread = relationship("Thread", back_populates="messages")
 
 class PromptLog(Base):
@@ -43,7 +103,7 @@ class PromptLog(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     system_prompt = Column(Text, nullable=False)
     user_prompt = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
 
 class ResearchResult(Base):
     __tablename__ = "research_results"
@@ -52,32 +112,98 @@ class ResearchResult(Base):
     query = Column(Text, nullable=False)
     findings = Column(Text, nullable=True)
     analysis = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
 
 class Document(Base):
     __tablename__ = "documents"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     file_path = Column(String(255), nullable=False)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     document_id = Column(Integer, nullable=True)
     document_name = Column(String(255), nullable=True)
     document_num = Column(String(255), nullable=True)
     document_url = Column(String(255), nullable=True)
-    uploaded_at = Column(DateTime, default=func.now())
-    download_date = Column(DateTime, default=func.now())
+    uploaded_at = Column(DateTime, default=func.now(), server_default=func.now())
+    download_date = Column(DateTime, default=func.now(), server_default=func.now())
     user = relationship("User", back_populates="documents")
 
-async def get_messages(thread_id: str, db, user_id: Optional[int] = None) -> List[Dict]:
-    """Получает историю сообщений из базы данных."""
+async def get_messages(
+    thread_id: str,
+    db,
+    user_id: Optional[int] = None,
+    *,
+    after: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[Dict]:
+    """
+    Получает историю сообщений из базы данных.
+
+    Для постраничной загрузки передайте limit и id последнего полученного
+    сообщения в after (keyset-пагинация, без OFFSET).
+    """
+    # Синхронный запрос выполняем в пуле потоков, чтобы не блокировать event loop
+    return await asyncio.to_thread(_load_messages, thread_id, db, user_id, after, limit)
+
+def _load_messages(
+    thread_id: str,
+    db,
+    user_id: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[Dict]:
+    """Синхронно читает сообщения треда с проверкой владельца."""
+    query = db.query(Message).filter(Message.thread_id == thread_id)
     if user_id:
-        thread = db.query(Thread).filter_by(id=thread_id).first()
-        if not thread or thread.user_id != user_id:
-            raise HTTPException(status_code=403, detail="Access denied to this thread")
+        # Проверяем владельца тем же запросом (JOIN с threads), без отдельного SELECT треда
+        query = query.join(Thread).filter(Thread.user_id == user_id)
+    if after is not None:
+        # Курсор (created_at, id): у пары вопрос/ответ created_at может совпадать
+        cursor_created_at = (
+            db.query(Message.created_at)
+            .filter(Message.id == after, Message.thread_id == thread_id)
+            .scalar_subquery()
+        )
+        query = query.filter(or_(
+            Message.created_at > cursor_created_at,
+            and_(Message.created_at == cursor_created_at, Message.id > after)
+        ))
+    query = query.order_by(Message.created_at.asc(), Message.id.asc())
+    if limit is not None:
+        query = query.limit(limit)
     
-    query = db.query(Message).filter(Message.thread_id == thread_id)
-    messages = query.order_by(Message.created_at.asc()).all()
+    # Читаем строки порциями через курсор, не собирая сначала полный список ORM-объектов
+    messages = [
+        {
+            'id': msg.id,
+            'role': msg.role,
+            'content': msg.content,
+            'created_at': msg.created_at.isoformat() if msg.created_at else None
+        }
+        for msg in query.yield_per(500)
+    ]
+    
+    if user_id and not messages:
+        # Пустой результат: тред без сообщений либо чужой/несуществующий тред
+        owner_id = db.query(Thread.user_id).filter_by(id=thread_id).scalar()
+        if owner_id != user_id:
+            raise HTTPException(status_code=403, detail="Access denied to this thread")
     
-    return [{'role': msg.role, 'content': msg.content, 'created_at': msg.created_at.isoformat() if msg.created_at else None} for msg in messages]
+    return messages
+
+def bulk_insert_messages(db, rows: List[Dict]) -> List[int]:
+    """
+    Вставляет пачку сообщений одним INSERT (executemany) вместо add() по одному.
+
+    Возвращает id вставленных строк, если СУБД поддерживает RETURNING для
+    executemany (PostgreSQL, SQLite); для MySQL возвращает пустой список.
+    Коммит остаётся за вызывающим кодом.
+    """
+    if not rows:
+        return []
+    if db.get_bind().dialect.insert_executemany_returning:
+        return list(db.execute(insert(Message).returning(Message.id), rows).scalars())
+    db.execute(insert(Message), rows)
+    return []
 
-__all__ = ['ScrapedContent', 'User', 'Thread', 'Message', 'PromptLog', 'ResearchResult', 'Document', 'get_messages']
\ No newline at end of file
+__all__ = ['ScrapedContent', 'User', 'VerificationCode', 'TempUser', 'PasswordReset', 'Thread', 'Message', 'PromptLog', 'ResearchResult', 'Document', 'get_messages', 'bulk_insert_messages']
\ No newline at end of file
@@ -1,11 +1,11 @@
 """
 Модели для работы с результатами веб-скрапинга.
 """
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-import json
-from urllib.parse import urlparse
+import orjson
+from urllib.parse import urlparse, ParseResult
 import hashlib
 
 @dataclass
@@ -22,13 +22,13 @@ class ScrapedContent:
     
     def __post_init__(self):
         """Валидация после инициализации."""
-        self._validate_url()
+        parsed = urlparse(self.url)
+        self._validate_url(parsed)
         self._validate_timestamp()
-        self._init_metadata()
+        self._init_metadata(parsed)
     
-    def _validate_url(self) -> None:
+    def _validate_url(self, parsed: ParseResult) -> None:
         """Проверяет корректность URL."""
-        parsed = urlparse(self.url)
         if not all([parsed.scheme, parsed.netloc]):
             raise ValueError(f"Некорректный URL: {self.url}")
     
@@ -39,12 +39,12 @@ class ScrapedContent:
         elif not isinstance(self.timestamp, datetime):
             raise ValueError(f"Некорректный timestamp: {self.timestamp}")
     
-    def _init_metadata(self) -> None:
+    def _init_metadata(self, parsed: ParseResult) -> None:
         """Инициализирует метаданные."""
         if self.metadata is None:
             self.metadata = {}
         self.metadata.update({
-            "domain": urlparse(self.url).netloc,
+            "domain": parsed.netloc,
             "content_length": len(self.text),
             "has_html": bool(self.html),
             "images_count": len(self.images) if self.images else 0,
@@ -57,13 +57,18 @@ class ScrapedContent:
     
     def to_dict(self) -> Dict[str, Any]:
         """Конвертирует результат в словарь."""
-        data = asdict(self)
-        data["timestamp"] = data["timestamp"].isoformat()
+        # Поверхностная копия вместо asdict(): без рекурсивного deepcopy всех полей
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        if self.images is not None:
+            data["images"] = list(self.images)
+        if self.metadata is not None:
+            data["metadata"] = dict(self.metadata)
+        data["timestamp"] = self.timestamp.isoformat()
         return data
     
     def to_json(self) -> str:
         """Сериализует объект в JSON."""
-        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        return orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2).decode('utf-8')
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ScrapedContent':
@@ -75,7 +80,7 @@ class ScrapedContent:
     @classmethod
     def from_json(cls, json_str: str) -> 'ScrapedContent':
         """Создает объект из JSON."""
-        data = json.loads(json_str)
+        data = orjson.loads(json_str)
         return cls.from_dict(data)
     
     def get_summary(self, max_length: int = 200) -> str:
@@ -87,8 +92,17 @@ class ScrapedContent:
     
     def get_content_hash(self) -> str:
         """Возвращает хеш контента для сравнения."""
-        content = f"{self.title}{self.text}".encode('utf-8')
-        return hashlib.sha256(content).hexdigest()
+        # Хеш кешируется на экземпляре и пересчитывается только при смене title/text
+        cached = getattr(self, "_content_hash", None)
+        if cached is not None and cached[0] is self.title and cached[1] is self.text:
+            return cached[2]
+        # Подаём поля в хешер по очереди, без склейки в одну большую строку
+        hasher = hashlib.blake2b(digest_size=32)
+        hasher.update(self.title.encode('utf-8'))
+        hasher.update(self.text.encode('utf-8'))
+        digest = hasher.hexdigest()
+        self._content_hash = (self.title, self.text, digest)
+        return digest
     
     def __eq__(self, other: object) -> bool:
         """Сравнивает два результата скрапинга."""
@@ -106,7 +120,8 @@ class ScrapedContent:
             title=self.title or other.title,
             text=f"{self.text}\n\n{other.text}".strip(),
             html=self.html or other.html,
-            images=list(set(self.images or [] + other.images or [])),
+            # dict.fromkeys сохраняет порядок первого появления и убирает дубли за O(n+m)
+            images=list(dict.fromkeys((self.images or []) + (other.images or []))),
             metadata={**self.metadata, **other.metadata},
             timestamp=max(self.timestamp, other.timestamp),
             error=None
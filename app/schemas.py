@@ -1,8 +1,13 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, Field
+from typing import Annotated, Any, Dict, Optional
+
+# Email приводим к нижнему регистру на входе, как он хранится в БД
+NormalizedEmail = Annotated[EmailStr, AfterValidator(lambda value: value.strip().lower())]
+# Одноразовый код подтверждения: не более 6 цифр
+VerificationCodeValue = Annotated[int, Field(ge=0, le=999999)]
 
 class UserCreate(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
     password: str
     first_name: str
     last_name: str
@@ -14,19 +19,18 @@ class UserOut(BaseModel):
     last_name: str
     is_active: bool
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 class VerificationRequest(BaseModel):
-    email: EmailStr
-    code: int
+    email: NormalizedEmail
+    code: VerificationCodeValue
 
 class UserLogin(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
     password: str
 
 class RegisterResponse(BaseModel):
@@ -34,17 +38,17 @@ class RegisterResponse(BaseModel):
     token_type: str
 
 class CodeVerificationRequest(BaseModel):
-    code: int
+    code: VerificationCodeValue
 
 class VerifyRequest(BaseModel):
-    code: int
+    code: VerificationCodeValue
 
 class PasswordResetRequest(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
 
 class PasswordResetConfirm(BaseModel):
-    email: EmailStr
-    code: int
+    email: NormalizedEmail
+    code: VerificationCodeValue
     new_password: str
 
 class FileUploadResponse(BaseModel):
@@ -54,5 +58,5 @@ class FileUploadResponse(BaseModel):
     text: Optional[str] = None
     error: Optional[str] = None
     processingTime: Optional[float] = None
-    metadata: Optional[dict] = None
+    metadata: Optional[Dict[str, Any]] = None
     downloadUrl: Optional[str] = None  # Ссылка для скачивания полного текста
\ No newline at end of file
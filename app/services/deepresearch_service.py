@@ -4,21 +4,25 @@
 """
 import re
 import os
-import sys
-import json
+import hashlib
+import orjson
 import asyncio
 import logging
-from typing import Dict, Optional, Any, List, Union
+from typing import AsyncIterator, Dict, Iterable, Optional, Any, List, Tuple, Union
 from datetime import datetime
+from functools import lru_cache, partial
+from itertools import accumulate
+from bisect import bisect_right
 from sqlalchemy.orm import Session
 
-from app.handlers.es_law_search import search_law_chunks
-from app.services.tavily_service import TavilyService
+from app.handlers.es_law_search import ARBITRATION_CASE_NUMBER_RE, CASE_NUMBER_MARKER, search_law_chunks
+from app.services.tavily_service import get_tavily_service
 from app.services.deepseek_service import DeepSeekService
 from app.services.prompt_builder import PromptBuilder
 from app.services.web_scraper import WebScraper
-from app.models import PromptLog, ResearchResult
+from app.models import PromptLog, ResearchResult as ResearchResultModel
 from app.utils.logger import LogLevel, get_logger
+from app.utils.cache import TTLCache
 
 # Системные промпты
 GENERAL_SYSTEM_PROMPT = """
@@ -117,18 +121,246 @@ RESEARCH_SYSTEM_PROMPT = """
 Ты — юридический ассистент LawGPT. Проанализируй предоставленные данные и дай структурированный, обоснованный юридический ответ согласно инструкциям.
 """
 
-# 📂 Добавление пути к third_party для корректного импорта shandu
-BASE_DIR = os.path.dirname(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-THIRD_PARTY_DIR = os.path.join(BASE_DIR, "third_party")
-if THIRD_PARTY_DIR not in sys.path:
-    sys.path.insert(0, THIRD_PARTY_DIR)
+# Тексты ответов пользователю при ошибках
+RESEARCH_ERROR_MESSAGE = "Извините, произошла ошибка при обработке запроса."
+RESPONSE_PARSE_ERROR_MESSAGE = "Извините, произошла ошибка при обработке ответа от модели."
 
 # Добавление констант для контроля размера
 MAX_INPUT_QUERY_SIZE = 24000  # Увеличиваем лимит для входного запроса
 MAX_ADDITIONAL_CONTEXT_SIZE = 32000  # Увеличиваем лимит на дополнительный контекст
 MAX_SEARCH_RESULTS = 10  # Максимальное количество результатов поиска
 MIN_RELEVANCE_SCORE = 0.6  # Минимальный порог релевантности
+SEARCH_TIMEOUT = 8.0  # Общий дедлайн (сек) на параллельный поиск в ES и Tavily
+
+# Результаты поиска ES + Tavily по одинаковому запросу (общие для всех экземпляров сервиса)
+_SOURCES_CACHE = TTLCache(maxsize=256, ttl=300)
+
+# Ответы модели на полностью совпадающий набор сообщений (ключ — SHA-256 запроса к API)
+LLM_CACHE_TTL = 24 * 3600
+_LLM_CACHE = TTLCache(maxsize=512, ttl=LLM_CACHE_TTL)
+# Запросы к модели, ответ на которые ещё не получен: одинаковые запросы ждут одну задачу
+_LLM_INFLIGHT: Dict[str, asyncio.Task] = {}
+
+
+def _finish_llm_request(key: str, task: asyncio.Task) -> None:
+    """Снимает запрос с учёта «в полёте» и кеширует успешный ответ."""
+    _LLM_INFLIGHT.pop(key, None)
+    if not task.cancelled() and task.exception() is None:
+        _LLM_CACHE.set(key, task.result())
+
+# ===== Словари для классификации запросов (is_general_query) =====
+# Сокращения кодексов и законов (ищутся как отдельные слова: "ук", но не "рука")
+_CODE_ABBREVIATIONS = frozenset((
+    "гк", "гк рф",
+    "гпк", "гпк рф",
+    "упк", "упк рф",
+    "ук", "ук рф",
+    "кас", "кас рф",
+    "коап", "коап рф",
+    "тк", "тк рф",
+    "жк", "жк рф",
+    "зк", "зк рф",
+    "бк", "бк рф",
+    "нк", "нк рф",
+    "апк", "апк рф",
+    "ск", "ск рф"
+))
+
+# Номера судебных дел
+# Числовые части ограничены соседними нецифровыми символами: "123-45/20231"
+# не даёт ложного совпадения "23-45/2023", а поиск по длинным рядам цифр
+# не перебирает все точки начала внутри числа
+_CASE_NUMBER_PATTERNS = (
+    ARBITRATION_CASE_NUMBER_RE.pattern,  # Арбитражные дела: А40-12345/2023 (общий шаблон с es_law_search)
+    r'(?<!\d)\d{1,2}-\d+/\d{2,4}(?!\d)',  # Суды общей юрисдикции: 2-1234/2023
+    r'(?<!\d)\d{1,2}[АA][ПпPp]/\d{2,4}(?!\d)',  # Административные дела: 3АП/2023
+    r'[УуUu]\d{1,2}-\d+/\d{2,4}(?!\d)',  # Уголовные дела: У1-1234/2023
+    r'[МмMm]\d{1,2}-\d+/\d{2,4}(?!\d)',  # Мировые судьи: М12-1234/2023
+    r'[КкKk][АаAa][СсSs]-\d+/\d{2,4}(?!\d)',  # Кассация: КАС-1234/2023
+    r'[ВвVv][СсSs]-\d+/\d{2,4}(?!\d)',  # Верховный суд: ВС-1234/2023
+)
+
+# Юридические термины (в основном основы слов)
+_LEGAL_TERMS = frozenset((
+    # Базовые юридические понятия
+    "закон",
+    "кодекс",
+    "статья",
+    "ст",  # Добавляем сокращение статьи
+    "договор",
+    "иск",
+    "указ",
+    "постановление",
+    "распоряжение",
+    "суд",
+    "право",
+    "юрист",
+    "норма",
+    "регулирован",
+    "законодательств",
+    "ответственност",
+    "обязательств",
+    "претензи",
+    "вина",
+    "устав",
+    "соглашение",
+    "приговор",
+    "протокол",
+    "правомочи",
+    "правоспособност",
+    "дееспособност",
+    "юрисдикц",
+    "субъект",
+    "объект права",
+    "правоотношени",
+    "правопреемств",
+    "презумпц",
+    "юстиц",
+    "правоприменен",
+    "правонаделен",
+    "деликт",
+    "декрет",
+    "доктрин",
+    "прецедент",
+    "санкци",
+    "диспозиц",
+    "гипотез",
+    "правопорядок",
+    "легитимн",
+    "легализац",
+    "квалификац",
+    "юридическ",
+    "удостоверен",
+    "заверен",
+    "определение",
+    "рассрочк",
+    "исполнен",
+))
+
+# Общие паттерны: приветствия, согласие/несогласие
+_GENERAL_PATTERNS = frozenset((
+    # Приветствия
+    "привет",
+    "здравствуй",
+    "добрый день",
+    "доброе утро",
+    "добрый вечер",
+    "здорово",
+    "хай",
+    "приветствую",
+    "салют",
+    "доброго времени",
+    "хеллоу",
+    "ку",
+    "хола",
+    "йоу",
+    "вечер добрый",
+
+    # Согласие/несогласие
+    "да",
+    "нет",
+    "согласен",
+    "не согласен",
+    "конечно",
+    "разумеется"
+))
+
+
+def _trie_to_regex(node: Dict[str, Any]) -> str:
+    """Рекурсивно превращает узел префиксного дерева в фрагмент регулярного выражения."""
+    is_terminal = "" in node
+    branches = [token + _trie_to_regex(child) for token, child in sorted(node.items()) if token]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not is_terminal:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")" + ("?" if is_terminal else "")
+
+
+def _compile_terms(terms: Iterable[str], whole_word_max_len: int, word_start_max_len: int = 0) -> re.Pattern:
+    """
+    Собирает список терминов в одно регулярное выражение.
+
+    Термины длиной до whole_word_max_len ищутся как отдельные слова,
+    до word_start_max_len — только с начала слова, остальные — как подстрока.
+    Выражение строится по префиксному дереву (как автомат Ахо–Корасик):
+    общие префиксы ("прав", "закон") проверяются один раз, и стоимость поиска
+    почти не растёт с числом терминов.
+    """
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        tokens = [re.escape(ch) for ch in term]
+        if len(term) <= word_start_max_len or len(term) <= whole_word_max_len:
+            tokens.insert(0, r"\b")
+        if len(term) <= whole_word_max_len:
+            tokens.append(r"\b")
+        node = trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[""] = {}
+    return re.compile(_trie_to_regex(trie), re.IGNORECASE)
+
+
+_CODE_RE = _compile_terms(_CODE_ABBREVIATIONS, whole_word_max_len=10)
+_CASE_RE = re.compile("|".join(f"(?:{pattern})" for pattern in _CASE_NUMBER_PATTERNS), re.IGNORECASE)
+_LEGAL_RE = _compile_terms(_LEGAL_TERMS, whole_word_max_len=2, word_start_max_len=4)
+_GENERAL_RE = _compile_terms(_GENERAL_PATTERNS, whole_word_max_len=3)
+
+
+@lru_cache(maxsize=4096)
+def _classify_query(query_lower: str) -> Tuple[str, Optional[str]]:
+    """
+    Классифицирует нормализованный запрос (нижний регистр, без крайних пробелов).
+
+    Returns:
+        Категория запроса и найденный фрагмент (если есть). Функция чистая и
+        кешируется: повторные и одинаковые запросы не сканируются заново.
+    """
+    # Пустой запрос или одиночный символ не с чем сопоставлять
+    if len(query_lower) < 2:
+        return "empty", None
+
+    # 1. Сначала проверяем сокращения кодексов и законов
+    match = _CODE_RE.search(query_lower)
+    if match:
+        return "code", match.group(0)
+
+    # 2. Проверяем номера дел. Все шаблоны содержат обязательный "/": без него
+    # не запускаем _CASE_RE, который на каждой позиции перебирает все ветви
+    if CASE_NUMBER_MARKER in query_lower:
+        match = _CASE_RE.search(query_lower)
+        if match:
+            return "case_number", match.group(0)
+
+    # 3. Проверяем юридические термины
+    match = _LEGAL_RE.search(query_lower)
+    if match:
+        return "legal_term", match.group(0)
+
+    # 4. Только после всех юридических проверок смотрим общие паттерны
+    match = _GENERAL_RE.search(query_lower)
+    if match:
+        return "general", match.group(0)
+
+    # Если запрос очень короткий (менее 3 слов), скорее всего это общий запрос
+    # Сначала дешёвая проверка длины, split() только для коротких строк
+    if len(query_lower) < 15 and len(query_lower.split()) < 3:
+        return "short", None
+
+    # По умолчанию считаем запрос общим, если не подтвердилось, что он юридический
+    return "default", None
+
+
+# Категория запроса -> (является ли запрос общим, сообщение для лога)
+_QUERY_CATEGORY_LOG = {
+    "code": (False, "Найден кодекс в запросе '{query}': {found}"),
+    "case_number": (False, "Найден номер судебного дела: {found}"),
+    "legal_term": (False, "Найден юридический термин: {found}"),
+    "general": (True, "Найден общий паттерн: {found}"),
+    "empty": (True, "Пустой запрос, считаем общим"),
+    "short": (True, "Запрос короткий, считаем общим"),
+    "default": (True, "Запрос не определен как юридический, считаем общим"),
+}
 
 # Улучшенная конфигурация логгера для детальной информации
 # logging.basicConfig(
@@ -153,63 +385,43 @@ def truncate_text_intelligently(text: str, max_length: int) -> str:
     if len(paragraphs) <= 1:
         return text[:start_buffer] + "..." + text[-end_buffer:]
 
-    start_text = ""
-    for p in paragraphs:
-        if len(start_text) + len(p) + 2 <= start_buffer:
-            start_text += p + "\n\n"
-        else:
-            if len(start_text) < start_buffer:
-                remaining = start_buffer - len(start_text)
-                if remaining > 20:
-                    start_text += p[:remaining] + "..."
-            break
-
-    end_text = ""
-    for p in reversed(paragraphs):
-        if len(end_text) + len(p) + 2 <= end_buffer:
-            end_text = p + "\n\n" + end_text
-        else:
-            if len(end_text) < end_buffer:
-                remaining = end_buffer - len(end_text)
-                if remaining > 20:
-                    end_text = "..." + p[-remaining:] + "\n\n" + end_text
-            break
+    # Префиксные суммы длин абзацев (с разделителем "\n\n"): число целых абзацев,
+    # помещающихся в буфер, находим бинарным поиском, а текст собираем одним join
+    start_sums = list(accumulate(len(p) + 2 for p in paragraphs))
+    start_count = bisect_right(start_sums, start_buffer)
+    start_text = "\n\n".join(paragraphs[:start_count]) + "\n\n" if start_count else ""
+    if start_count < len(paragraphs):
+        remaining = start_buffer - len(start_text)
+        if remaining > 20:
+            start_text += paragraphs[start_count][:remaining] + "..."
+
+    end_sums = list(accumulate(len(p) + 2 for p in reversed(paragraphs)))
+    end_count = bisect_right(end_sums, end_buffer)
+    end_text = "\n\n".join(paragraphs[len(paragraphs) - end_count:]) + "\n\n" if end_count else ""
+    if end_count < len(paragraphs):
+        remaining = end_buffer - len(end_text)
+        if remaining > 20:
+            end_text = "..." + paragraphs[len(paragraphs) - end_count - 1][-remaining:] + "\n\n" + end_text
 
     if middle_buffer > 100:
-        middle_start_index = len(start_text)
-        middle_end_index = len(text) - len(end_text)
-        middle_text = text[middle_start_index:middle_end_index]
-        middle_paragraphs = middle_text.split('\n\n')
-        selected_middle = ""
+        # Средние абзацы берём срезом уже разбитого списка, без повторного split
+        middle_paragraphs = paragraphs[start_count:len(paragraphs) - end_count]
+        # Абзацы копим в списке с текущей длиной и склеиваем один раз
+        selected_middle = []
+        selected_length = 0
         middle_position = len(middle_paragraphs) // 2
         for i in range(max(0, middle_position - 1), min(len(middle_paragraphs), middle_position + 2)):
-            if len(selected_middle) + len(middle_paragraphs[i]) + 2 <= middle_buffer:
-                selected_middle += middle_paragraphs[i] + "\n\n"
+            if selected_length + len(middle_paragraphs[i]) + 2 <= middle_buffer:
+                selected_middle.append(middle_paragraphs[i])
+                selected_length += len(middle_paragraphs[i]) + 2
             else:
                 break
-        return start_text + "\n...\n\n" + selected_middle + "\n...\n\n" + end_text
+        middle = "\n\n".join(selected_middle) + "\n\n" if selected_middle else ""
+        return "".join((start_text, "\n...\n\n", middle, "\n...\n\n", end_text))
 
     return start_text + "\n...\n\n" + end_text
 
 
-def highlight_court_numbers(query: str) -> str:
-    """
-    Выделяет номера судебных дел в запросе с учетом различных форматов российских судов.
-    """
-    """Заглушка для функции выделения номеров судебных дел"""
-    return query
-
-
-def validate_court_numbers(response: str, original_query: str) -> str:
-    """Заглушка для функции валидации номеров судебных дел"""
-    return response
-
-
-def ensure_valid_court_numbers(answer: str, original_query: str) -> str:
-    """Заглушка для функции финальной проверки номеров дел"""
-    return answer
-
-
 class ResearchResult:
     """Контейнер для результатов исследования."""
 
@@ -239,8 +451,8 @@ class ResearchResult:
 
     def save_to_file(self, filepath: str) -> None:
         """Сохраняет результат в файл."""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
 
 class PromptLogger:
@@ -276,7 +488,8 @@ class PromptLogger:
     
     def save_log(self, message: str, level: str = 'INFO'):
         """Сохраняет лог в файл"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
         
         # Записываем в общий лог-файл
         if level.upper() == 'ERROR':
@@ -288,7 +501,7 @@ class PromptLogger:
         if level.upper() in ['ERROR', 'WARNING']:
             log_file = os.path.join(self.logs_dir, f'log_{timestamp}.txt')
             with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(f"{datetime.now().isoformat()} - {level} - {message}\n")
+                f.write(f"{now.isoformat()} - {level} - {message}\n")
     
     def save_prompt(self, messages: List[Dict], query: str, parameters: Dict):
         """Сохраняет промпт в JSON файл"""
@@ -302,8 +515,8 @@ class PromptLogger:
             "parameters": parameters
         }
         
-        with open(prompt_file, 'w', encoding='utf-8') as f:
-            json.dump(prompt_data, f, ensure_ascii=False, indent=2)
+        with open(prompt_file, 'wb') as f:
+            f.write(orjson.dumps(prompt_data, option=orjson.OPT_INDENT_2, default=str))
             
         self.save_log(f"Сохранен промпт: {prompt_file}")
     
@@ -318,8 +531,8 @@ class PromptLogger:
             "response": response
         }
         
-        with open(response_file, 'w', encoding='utf-8') as f:
-            json.dump(response_data, f, ensure_ascii=False, indent=2)
+        with open(response_file, 'wb') as f:
+            f.write(orjson.dumps(response_data, option=orjson.OPT_INDENT_2, default=str))
             
         self.save_log(f"Сохранен ответ: {response_file}")
 
@@ -342,7 +555,7 @@ class DeepResearchService:
 
         # Инициализируем сервисы
         self.deepseek_service = DeepSeekService()
-        self.tavily_service = TavilyService()
+        self.tavily_service = get_tavily_service()
         self.prompt_builder = PromptBuilder(self.deepseek_service)
         self.web_scraper = WebScraper(
             timeout=20,
@@ -358,7 +571,6 @@ class DeepResearchService:
             f"DeepResearchService инициализирован. Директория для результатов: {self.output_dir}",
             LogLevel.INFO
         )
-        self.usage_counter = 0
 
     async def research(
         self, 
@@ -387,10 +599,13 @@ class DeepResearchService:
         Returns:
             ResearchResult с результатами исследования
         """
+        # Время запроса берём один раз: и для лога, и для метки результата
+        started_at = datetime.now()
+        timestamp = started_at.strftime("%Y%m%d_%H%M%S")
         try:
             # 1. Логируем начало исследования
             log_entry = {
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": started_at.isoformat(),
                 "action": "research",
                 "query": query,
                 "thread_id": thread_id,
@@ -408,28 +623,25 @@ class DeepResearchService:
                     {"role": "system", "content": GENERAL_SYSTEM_PROMPT},
                     {"role": "user", "content": query}
                 ]
-                response = await self.deepseek_service.chat_completion(messages=messages)
+                response = await self._cached_completion(messages)
                 content, reasoning_content = self.get_response_content(response)
                 
                 log_entry.update({
                     "status": "success",
                     "is_general": True
                 })
-                self.logger.log(json.dumps(log_entry), LogLevel.INFO)
+                self._log_json(log_entry, LogLevel.INFO)
                 
                 return ResearchResult(
                     query=query,
                     analysis=content,
-                    timestamp=self._get_timestamp(),
+                    timestamp=timestamp,
                     reasoning_content=reasoning_content
                 )
             
             # 4. Для юридических запросов выполняем поиск и формируем обогащенный промпт
             # Выполняем поиск параллельно
-            es_results, tavily_results = await asyncio.gather(
-                search_law_chunks(query, size=6),  # Ограничиваем до 6 результатов
-                self.tavily_service.search(query, max_results=5)  # Минимум 5 результатов
-            )
+            es_results, tavily_results = await self._search_sources(query)
             
             log_entry.update({
                 "es_results_count": len(es_results),
@@ -447,38 +659,20 @@ class DeepResearchService:
             )
             
             # 6. Получаем ответ от DeepSeek
-            response = await self.deepseek_service.chat_completion(
-                messages=prompt_result["messages"],
+            # Если источник вернул пустой список (возможно, из-за сбоя), ответ не кешируем
+            response = await self._cached_completion(
+                prompt_result["messages"],
+                use_cache=bool(es_results and tavily_results),
                 max_tokens=8192
             )
             content, reasoning_content = self.get_response_content(response)
             
-            # 7. Сохраняем результаты в БД
+            # 7. Сохраняем результаты в БД (синхронная сессия — в пуле потоков)
             if db and thread_id and user_id:
-                try:
-                    # Сохраняем промпт
-                    db.add(PromptLog(
-                        thread_id=thread_id,
-                        user_id=user_id,
-                        system_prompt=LEGAL_SYSTEM_PROMPT,
-                        user_prompt=query,
-                        message_id=message_id
-                    ))
-                    
-                    # Сохраняем результат исследования
-                    db.add(ResearchResult(
-                        thread_id=thread_id,
-                        query=query,
-                        findings=json.dumps({
-                            "es_results": es_results,
-                            "tavily_results": tavily_results
-                        }),
-                        analysis=content
-                    ))
-                    
-                    db.commit()
-                except Exception as e:
-                    self.logger.log(f"❌ Ошибка при сохранении в БД: {str(e)}", LogLevel.ERROR)
+                await asyncio.to_thread(
+                    self._persist, db, thread_id, user_id, message_id,
+                    query, es_results, tavily_results, content
+                )
             
             # 8. Логируем успешное завершение
             log_entry.update({
@@ -486,27 +680,196 @@ class DeepResearchService:
                 "is_general": False,
                 "prompt_metadata": prompt_result["metadata"]
             })
-            self.logger.log(json.dumps(log_entry), LogLevel.INFO)
+            self._log_json(log_entry, LogLevel.INFO)
             
             return ResearchResult(
                 query=query,
                 analysis=content,
-                timestamp=self._get_timestamp(),
+                timestamp=timestamp,
                 reasoning_content=reasoning_content
             )
 
         except Exception as e:
             error_log = {**log_entry, "status": "error", "error": str(e)}
-            self.logger.log(json.dumps(error_log), LogLevel.ERROR)
+            self._log_json(error_log, LogLevel.ERROR)
             
             return ResearchResult(
                 query=query,
-                analysis="Извините, произошла ошибка при обработке запроса.",
+                analysis=RESEARCH_ERROR_MESSAGE,
                 error=str(e),
-                timestamp=self._get_timestamp(),
+                timestamp=timestamp,
                 reasoning_content=None
             )
 
+    async def research_stream(
+        self,
+        query: str,
+        chat_history: Optional[Union[str, List[Dict]]] = None,
+        thread_id: Optional[str] = None,
+        user_id: Optional[int] = None,
+        db: Optional[Session] = None,
+        message_id: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Потоковый вариант research(): отдаёт ответ DeepSeek фрагментами по мере генерации.
+
+        Поиск и сборка промпта те же, что в research(); результаты сохраняются
+        в БД после окончания потока, когда ответ собран целиком.
+        """
+        is_general = self.is_general_query(query)
+        es_results: List[Any] = []
+        tavily_results: List[Any] = []
+        parts: List[str] = []
+        try:
+            if is_general:
+                messages = [
+                    {"role": "system", "content": GENERAL_SYSTEM_PROMPT},
+                    {"role": "user", "content": query}
+                ]
+            else:
+                es_results, tavily_results = await self._search_sources(query)
+                prompt_result = await self.prompt_builder.build_prompt(
+                    query=query,
+                    es_results=es_results,
+                    tavily_results=tavily_results,
+                    chat_history=chat_history,
+                    system_prompt=LEGAL_SYSTEM_PROMPT,
+                    max_tokens=10000  # Используем расширенный лимит
+                )
+                messages = prompt_result["messages"]
+
+            async for delta in self.deepseek_service.chat_completion_stream(messages=messages, max_tokens=8192):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            self.logger.log(f"❌ Ошибка потокового исследования: {str(e)}", LogLevel.ERROR)
+            if not parts:
+                yield RESEARCH_ERROR_MESSAGE
+            return
+
+        if not is_general and db and thread_id and user_id:
+            await asyncio.to_thread(
+                self._persist, db, thread_id, user_id, message_id,
+                query, es_results, tavily_results, "".join(parts)
+            )
+
+    def _persist(
+        self,
+        db: Session,
+        thread_id: str,
+        user_id: int,
+        message_id: Optional[int],
+        query: str,
+        es_results: List[Any],
+        tavily_results: List[Any],
+        content: str
+    ) -> None:
+        """Сохраняет промпт и результат исследования в БД одной транзакцией."""
+        try:
+            db.add(PromptLog(
+                thread_id=thread_id,
+                user_id=user_id,
+                system_prompt=LEGAL_SYSTEM_PROMPT,
+                user_prompt=query,
+                message_id=message_id
+            ))
+            db.add(ResearchResultModel(
+                thread_id=thread_id,
+                query=query,
+                findings=orjson.dumps({
+                    "es_results": es_results,
+                    "tavily_results": tavily_results
+                }, default=str).decode('utf-8'),
+                analysis=content
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            self.logger.log(f"❌ Ошибка при сохранении в БД: {str(e)}", LogLevel.ERROR)
+
+    async def _cached_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        use_cache: bool = True,
+        **kwargs: Any
+    ) -> Dict[str, Any]:
+        """
+        Запрос к DeepSeek с кешированием ответа по точному совпадению запроса.
+
+        Ключ — SHA-256 от модели, сообщений и параметров генерации. Ошибки API
+        пробрасываются и не кешируются. Одинаковые запросы, пришедшие до ответа
+        на первый, не уходят в API повторно, а ждут ту же задачу; отмена одного
+        из ожидающих не отменяет запрос для остальных. При use_cache=False
+        запрос уходит в API напрямую и ответ не кешируется.
+        """
+        if not use_cache:
+            return await self.deepseek_service.chat_completion(messages=messages, **kwargs)
+
+        key = hashlib.sha256(orjson.dumps(
+            {"model": self.deepseek_service.model, "messages": messages, **kwargs},
+            option=orjson.OPT_SORT_KEYS,
+            default=str
+        )).hexdigest()
+        cached = _LLM_CACHE.get(key)
+        if cached is not None:
+            self.logger.log("Ответ модели взят из кеша", LogLevel.INFO)
+            return cached
+
+        task = _LLM_INFLIGHT.get(key)
+        if task is None:
+            task = asyncio.create_task(self.deepseek_service.chat_completion(messages=messages, **kwargs))
+            _LLM_INFLIGHT[key] = task
+            task.add_done_callback(partial(_finish_llm_request, key))
+        else:
+            self.logger.log("Идентичный запрос уже отправлен в модель, ждём его ответа", LogLevel.INFO)
+        return await asyncio.shield(task)
+
+    async def _search_sources(self, query: str) -> Tuple[List[Any], List[Any]]:
+        """
+        Параллельно ищет по ES и Tavily с общим дедлайном SEARCH_TIMEOUT.
+
+        Источник, который упал или не уложился в дедлайн, даёт пустой список,
+        а результаты второго источника всё равно используются. Кешируются
+        по тексту запроса на 5 минут только ответы, где оба источника вернули
+        непустые результаты: search_law_chunks и TavilyService.search при сбое
+        сами возвращают [], и отличить сбой от пустой выдачи здесь нельзя.
+        """
+        cache_key = query.strip()
+        cached = _SOURCES_CACHE.get(cache_key)
+        if cached is not None:
+            self.logger.log("Результаты поиска взяты из кеша", LogLevel.INFO)
+            return cached
+
+        es_task = asyncio.create_task(search_law_chunks(query, size=6))  # Ограничиваем до 6 результатов
+        tavily_task = asyncio.create_task(self.tavily_service.search(query, max_results=5))  # Минимум 5 результатов
+        done, pending = await asyncio.wait({es_task, tavily_task}, timeout=SEARCH_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        complete = True
+        for source, task in (("Elasticsearch", es_task), ("Tavily", tavily_task)):
+            if task not in done:
+                self.logger.log(f"⏱️ {source}: поиск не уложился в {SEARCH_TIMEOUT} с, продолжаем без него", LogLevel.WARNING)
+                results.append([])
+                complete = False
+            elif task.exception() is not None:
+                self.logger.log(f"❌ {source}: ошибка поиска: {task.exception()}", LogLevel.WARNING)
+                results.append([])
+                complete = False
+            else:
+                result = task.result() or []
+                if not result:
+                    complete = False
+                results.append(result)
+
+        sources = (results[0], results[1])
+        if complete:
+            _SOURCES_CACHE.set(cache_key, sources)
+        return sources
+
     def is_general_query(self, query: str) -> bool:
         """
         Определяет, является ли запрос общим (не юридическим).
@@ -517,155 +880,12 @@ class DeepResearchService:
         Returns:
             True, если запрос общий, False, если юридический
         """
-        # Преобразуем запрос в нижний регистр для проверки
-        query_lower = query.lower().strip()
-
-        # 1. Сначала проверяем сокращения кодексов и законов
-        code_patterns = [
-            "гк", "гк рф",
-            "гпк", "гпк рф",
-            "упк", "упк рф",
-            "ук", "ук рф",
-            "кас", "кас рф",
-            "коап", "коап рф",
-            "тк", "тк рф",
-            "жк", "жк рф",
-            "зк", "зк рф",
-            "бк", "бк рф",
-            "нк", "нк рф",
-            "апк", "апк рф",
-            "ск", "ск рф"
-        ]
-
-        # Проверяем кодексы без учета регистра
-        for pattern in code_patterns:
-            # Преобразуем и паттерн, и часть запроса в нижний регистр для сравнения
-            if any(p.lower() in query_lower for p in [pattern, pattern.upper(), pattern.title()]):
-                # Для логирования используем оригинальный текст из запроса
-                found_pattern = next(p for p in [pattern, pattern.upper(), pattern.title()] if p.lower() in query_lower)
-                self.logger.log(f"Найден кодекс в запросе '{query}': {found_pattern}", LogLevel.INFO)
-                return False
-
-        # 2. Проверяем номера дел
-        case_patterns = [
-            r'[АA]\d{1,2}-\d+/\d{2,4}(?:-[А-Яа-яA-Za-z0-9]+)*',  # Арбитражные дела: А40-12345/2023
-            r'\d{1,2}-\d+/\d{2,4}',  # Суды общей юрисдикции: 2-1234/2023
-            r'\d{1,2}[АA][ПпPp]/\d{2,4}',  # Административные дела: 3АП/2023
-            r'[УуUu]\d{1,2}-\d+/\d{2,4}',  # Уголовные дела: У1-1234/2023
-            r'[МмMm]\d{1,2}-\d+/\d{2,4}',  # Мировые судьи: М12-1234/2023
-            r'[КкKk][АаAa][СсSs]-\d+/\d{2,4}',  # Кассация: КАС-1234/2023
-            r'[ВвVv][СсSs]-\d+/\d{2,4}',  # Верховный суд: ВС-1234/2023
-        ]
-
-        for pattern in case_patterns:
-            if re.search(pattern, query, re.IGNORECASE):
-                self.logger.log(f"Найден номер судебного дела по шаблону: {pattern}", LogLevel.INFO)
-                return False
-
-        # 3. Проверяем юридические термины
-        legal_terms = [
-            # Базовые юридические понятия
-            "закон",
-            "кодекс",
-            "статья",
-            "ст",  # Добавляем сокращение статьи
-            "договор",
-            "иск",
-            "указ",
-            "постановление",
-            "распоряжение",
-            "суд",
-            "право",
-            "юрист",
-            "норма",
-            "регулирован",
-            "законодательств",
-            "ответственност",
-            "обязательств",
-            "претензи",
-            "вина",
-            "устав",
-            "соглашение",
-            "приговор",
-            "протокол",
-            "правомочи",
-            "правоспособност",
-            "дееспособност",
-            "юрисдикц",
-            "субъект",
-            "объект права",
-            "правоотношени",
-            "правопреемств",
-            "презумпц",
-            "юстиц",
-            "правоприменен",
-            "правонаделен",
-            "деликт",
-            "декрет",
-            "доктрин",
-            "прецедент",
-            "санкци",
-            "диспозиц",
-            "гипотез",
-            "правопорядок",
-            "легитимн",
-            "легализац",
-            "квалификац",
-            "юридическ",
-            "удостоверен",
-            "заверен",
-            "определение",
-            "рассрочк",
-            "исполнен",
-            
-        ]
-
-        for term in legal_terms:
-            if term in query_lower:
-                self.logger.log(f"Найден юридический термин: {term}", LogLevel.INFO)
-                return False
-
-        # 4. Только после всех юридических проверок смотрим общие паттерны
-        general_patterns = [
-            # Приветствия
-            "привет",
-            "здравствуй",
-            "добрый день",
-            "доброе утро",
-            "добрый вечер",
-            "здорово",
-            "хай",
-            "приветствую",
-            "салют",
-            "доброго времени",
-            "хеллоу",
-            "ку",
-            "хола",
-            "йоу",
-            "вечер добрый",
-
-            # Согласие/несогласие
-            "да",
-            "нет",
-            "согласен",
-            "не согласен",
-            "конечно",
-            "разумеется"
-        ]
-
-        for pattern in general_patterns:
-            if pattern in query_lower:
-                self.logger.log(f"Найден общий паттерн: {pattern}", LogLevel.INFO)
-                return True
-
-        # Если запрос очень короткий (менее 3 слов), скорее всего это общий запрос
-        if len(query_lower.split()) < 3 and len(query_lower) < 15:
-            self.logger.log("Запрос короткий, считаем общим", LogLevel.INFO)
-            return True
-
-        # По умолчанию считаем запрос общим, если не подтвердилось, что он юридический
-        self.logger.log("Запрос не определен как юридический, считаем общим", LogLevel.INFO)
-        return True
+        category, found = _classify_query(query.lower().strip())
+        is_general, message = _QUERY_CATEGORY_LOG[category]
+        # Отладочное сообщение собираем, только если DEBUG включён
+        if self.logger.isEnabledFor(LogLevel.DEBUG):
+            self.logger.log(message.format(query=query, found=found), LogLevel.DEBUG)
+        return is_general
 
     def get_response_content(self, response):
         """
@@ -674,20 +894,24 @@ class DeepResearchService:
         try:
             # dict-стиль
             if isinstance(response, dict):
-                content = response["choices"][0]["message"]["content"]
-                reasoning_content = response["choices"][0]["message"].get("reasoning_content")
-            else:
-                # объект-стиль (на всякий случай)
-                content = response.choices[0].message.content
-                reasoning_content = getattr(response.choices[0].message, "reasoning_content", None)
-            return content, reasoning_content
+                message = response["choices"][0]["message"]
+                return message["content"], message.get("reasoning_content")
+            # объект-стиль (на всякий случай)
+            message = response.choices[0].message
+            return message.content, getattr(message, "reasoning_content", None)
         except Exception as e:
             self.logger.log(f"❌ Ошибка при разборе ответа DeepSeek: {str(e)}", LogLevel.ERROR)
-            return "Извините, произошла ошибка при обработке ответа от модели.", None
+            return RESPONSE_PARSE_ERROR_MESSAGE, None
+
+    async def aclose(self) -> None:
+        """Освобождает соединения сервиса при остановке приложения."""
+        await self.deepseek_service.aclose()
+        await self.web_scraper.aclose()
 
-    def _get_timestamp(self) -> str:
-        """Возвращает текущую метку времени в формате для имен файлов."""
-        return datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _log_json(self, data: Dict[str, Any], level: str = LogLevel.INFO) -> None:
+        """Логирует словарь одной JSON-строкой; не сериализует, если уровень отключён."""
+        if self.logger.isEnabledFor(level):
+            self.logger.log(orjson.dumps(data, default=str).decode('utf-8'), level)
 
 # Создаем глобальный экземпляр сервиса
 deep_research_service = DeepResearchService()
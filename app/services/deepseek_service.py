@@ -6,14 +6,15 @@
 import os
 import logging
 import json
+import orjson
 import aiohttp
 import asyncio
-from typing import List, Dict, Any, Optional, Union, Literal
+from typing import List, Dict, Any, Optional, Union, Literal, AsyncIterator
 from fastapi import HTTPException
 from app.utils import ensure_correct_encoding, sanitize_search_results, validate_messages, validate_context
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
-from app.config import DEEPSEEK_API_KEY, OPENROUTER_API_KEY
+from app.config import DEEPSEEK_API_KEY, OPENROUTER_API_KEY, DEEPSEEK_MAX_CONCURRENCY
 
 def decode_unicode(text: str) -> str:
     """Декодирует escape-последовательности Unicode в строке."""
@@ -22,11 +23,13 @@ def decode_unicode(text: str) -> str:
     except:
         return text
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-
+# Логгер модуля; корневой логгер настраивается точкой входа приложения
 logger = logging.getLogger(__name__)
 
+# Общий для всех экземпляров сервиса лимит одновременных запросов к OpenRouter:
+# всплеск пользователей ждёт здесь, а не получает 429 и повторы от API
+_API_SEMAPHORE = asyncio.Semaphore(DEEPSEEK_MAX_CONCURRENCY)
+
 class DeepSeekService:
     """
     Сервис для выполнения запросов к DeepSeek API.
@@ -50,6 +53,11 @@ class DeepSeekService:
             base_url="https://openrouter.ai/api/v1",
             api_key=openrouter_api_key
         )
+        # Асинхронный клиент для обычной и потоковой генерации
+        self.async_client = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=openrouter_api_key
+        )
         self.model = "deepseek/deepseek-chat-v3-0324"
         
     async def chat_completion(
@@ -62,18 +70,20 @@ class DeepSeekService:
         Отправка запроса к DeepSeek через OpenRouter API
         """
         try:
-            logger.info(f"Отправка запроса к OpenRouter API: {self.model}")
+            logger.info("Отправка запроса к OpenRouter API: %s", self.model)
             
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                extra_headers={
-                    "HTTP-Referer": "https://lawgpt.ru",  # URL нашего сайта
-                    "X-Title": "LawGPT",  # Название нашего приложения
-                }
-            )
+            # Асинхронный клиент: ожидание генерации не блокирует event loop
+            async with _API_SEMAPHORE:
+                completion = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    extra_headers={
+                        "HTTP-Referer": "https://lawgpt.ru",  # URL нашего сайта
+                        "X-Title": "LawGPT",  # Название нашего приложения
+                    }
+                )
             
             return {
                 "choices": [{
@@ -84,9 +94,48 @@ class DeepSeekService:
             }
             
         except Exception as e:
-            logger.error(f"Ошибка OpenRouter API: {str(e)}")
+            logger.error("Ошибка OpenRouter API: %s", e)
+            raise
+
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        temperature: float = 0.6,
+        max_tokens: int = 8192
+    ) -> AsyncIterator[str]:
+        """
+        Потоковый запрос к DeepSeek через OpenRouter API.
+        Отдаёт фрагменты текста ответа по мере их генерации.
+        """
+        try:
+            logger.info("Отправка потокового запроса к OpenRouter API: %s", self.model)
+            
+            # Слот занят, пока поток ответа не дочитан до конца
+            async with _API_SEMAPHORE:
+                stream = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    extra_headers={
+                        "HTTP-Referer": "https://lawgpt.ru",  # URL нашего сайта
+                        "X-Title": "LawGPT",  # Название нашего приложения
+                    }
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            
+        except Exception as e:
+            logger.error("Ошибка OpenRouter API (stream): %s", e)
             raise
 
+    async def aclose(self) -> None:
+        """Закрывает HTTP-клиенты (пулы соединений) к OpenRouter."""
+        self.client.close()
+        await self.async_client.close()
+
     async def prepare_context(self, context: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Подготовка контекста с обработкой кодировки"""
         # Обрабатываем кодировку всего контекста
@@ -137,7 +186,7 @@ class DeepSeekService:
                             detail=f"DeepSeek API error: {error_text}"
                         )
                     
-                    result = await response.json()
+                    result = orjson.loads(await response.read())
                     return ensure_correct_encoding(result["choices"][0]["message"]["content"])
                     
         except Exception as e:
@@ -197,7 +246,7 @@ async def _generate(
                         logging.error(f"API Error: {error_text}")
                         raise ValueError(f"API Error: {response.status} - {error_text}")
                     
-                    result = await response.json()
+                    result = orjson.loads(await response.read())
                     return result['choices'][0]['message']['content']
             
             except asyncio.TimeoutError:
@@ -270,7 +319,7 @@ async def chat_with_functions(
                         return f"Ошибка API: {response.status} - {response_text[:200]}..."
                     
                     try:
-                        response_json = json.loads(response_text)
+                        response_json = orjson.loads(response_text)
                         
                         # Проверяем наличие function_call в ответе
                         if 'choices' in response_json and len(response_json['choices']) > 0:
@@ -307,7 +356,7 @@ async def _process_stream(self, response):
                 if line.startswith('data: ') and line != 'data: [DONE]':
                     json_str = line[6:]  # Убираем 'data: '
                     try:
-                        chunk = json.loads(json_str)
+                        chunk = orjson.loads(json_str)
                         content = chunk.get('choices', [{}])[0].get('delta', {}).get('content', '')
                         if content:
                             return content
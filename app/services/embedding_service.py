@@ -3,6 +3,7 @@
 Использует sentence-transformers для генерации векторных представлений текста.
 """
 from typing import List
+import threading
 from sentence_transformers import SentenceTransformer
 import torch
 from app.utils.logger import get_logger, LogLevel
@@ -12,6 +13,7 @@ logger = get_logger()
 class EmbeddingService:
     _instance = None
     _model = None
+    _init_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
@@ -20,7 +22,10 @@ class EmbeddingService:
     
     def __init__(self):
         if self._model is None:
-            self._initialize_model()
+            # Модель может прогреваться в фоне при старте: грузим её только один раз
+            with self._init_lock:
+                if self._model is None:
+                    self._initialize_model()
     
     def _initialize_model(self):
         """Инициализирует модель для создания эмбеддингов."""
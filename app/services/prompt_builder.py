@@ -6,14 +6,47 @@
 - Сохранение важных юридических деталей при сжатии
 """
 import json
+import hashlib
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 from app.utils.logger import get_logger, LogLevel
+from app.utils.cache import TTLCache
 from app.services.deepseek_service import DeepSeekService
 
 # Инициализируем логгер
 logger = get_logger()
 
+# Системное сообщение с результатами поиска: разделитель, затем маркер
+SEARCH_RESULTS_MARKER = "РЕЗУЛЬТАТЫ ПОИСКА"
+SEARCH_BLOCK_SEPARATOR = "\n\n" + "=" * 80
+SEARCH_BLOCK_PREFIX = SEARCH_BLOCK_SEPARATOR + SEARCH_RESULTS_MARKER
+
+# Шаблоны служебных запросов к модели (подстановка через str.format)
+LEGAL_DETAILS_PROMPT = """Извлеки из текста важные юридические детали:
+1. Номера судебных дел (например, А40-12345/2023)
+2. Нормы права (например, ст. 15 ГК РФ)
+3. Ссылки на источники и НПА
+
+Текст:
+{text}
+
+Верни только найденные детали, каждую с новой строки. Если деталей нет, верни пустую строку."""
+
+COMPRESS_PROMPT = """Сократи следующий текст до {max_tokens} токенов, сохранив:
+1. ВСЕ номера судебных дел
+2. ВСЕ нормы права и ссылки на законы
+3. ВСЕ ссылки на источники
+4. Наиболее важные выводы и аргументы
+
+Текст для сжатия:
+{content}
+
+Сохрани структуру и форматирование исходного текста."""
+
+# Юридические детали, извлечённые моделью из текста результата (ключ — SHA-256 текста):
+# одни и те же фрагменты законов и страницы попадают в выдачу разных запросов
+_LEGAL_DETAILS_CACHE = TTLCache(maxsize=1024, ttl=24 * 3600)
+
 class PromptBuilder:
     """
     Класс для формирования промпта и интеллектуального сжатия текста.
@@ -75,12 +108,12 @@ class PromptBuilder:
             # Добавляем результаты поиска как контекст
             context = []
             if es_block:
-                context.append("РЕЗУЛЬТАТЫ ПОИСКА В ЗАКОНОДАТЕЛЬСТВЕ:\n" + es_block)
+                context.append(f"{SEARCH_RESULTS_MARKER} В ЗАКОНОДАТЕЛЬСТВЕ:\n" + es_block)
             if tavily_block:
-                context.append("РЕЗУЛЬТАТЫ ПОИСКА В ИНТЕРНЕТЕ:\n" + tavily_block)
+                context.append(f"{SEARCH_RESULTS_MARKER} В ИНТЕРНЕТЕ:\n" + tavily_block)
             
             if context:
-                context_message = "\n\n" + "=" * 80 + "\n\n".join(context)
+                context_message = SEARCH_BLOCK_SEPARATOR + "\n\n".join(context)
                 prompt_parts.append({"role": "system", "content": context_message})
             
             # Добавляем запрос пользователя
@@ -200,7 +233,9 @@ class PromptBuilder:
             return ""
             
         formatted = []
-        for result in results:
+        # В промпт идут только топ-5 результатов: остальные не форматируем
+        # и не гоняем через извлечение юридических деталей
+        for result in results[:5]:
             # Извлекаем основные поля
             title = result.get("title", "").strip()
             content = result.get("content", result.get("body", "")).strip()
@@ -223,7 +258,7 @@ class PromptBuilder:
             
             formatted.append("\n".join(parts))
         
-        return "\n\n" + "=" * 80 + "\n\n".join(formatted[:5])  # Берем только топ-5 результатов
+        return "\n\n" + "=" * 80 + "\n\n".join(formatted)
     
     async def _extract_legal_details(self, text: str) -> str:
         """
@@ -231,18 +266,17 @@ class PromptBuilder:
         - Номера судебных дел
         - Нормы права
         - Ссылки на источники
+
+        Результат кешируется по хешу текста; ошибки модели не кешируются.
         """
+        cache_key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        cached = _LEGAL_DETAILS_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
         prompt = {
             "role": "user",
-            "content": f"""Извлеки из текста важные юридические детали:
-1. Номера судебных дел (например, А40-12345/2023)
-2. Нормы права (например, ст. 15 ГК РФ)
-3. Ссылки на источники и НПА
-
-Текст:
-{text}
-
-Верни только найденные детали, каждую с новой строки. Если деталей нет, верни пустую строку."""
+            "content": LEGAL_DETAILS_PROMPT.format(text=text)
         }
         
         try:
@@ -253,7 +287,8 @@ class PromptBuilder:
             
             if isinstance(response, dict):
                 details = response["choices"][0]["message"]["content"].strip()
-                return details if details else ""
+                _LEGAL_DETAILS_CACHE.set(cache_key, details)
+                return details
             return ""
             
         except Exception as e:
@@ -276,7 +311,9 @@ class PromptBuilder:
         
         for part in prompt_parts:
             if part["role"] == "system":
-                if "РЕЗУЛЬТАТЫ ПОИСКА" in part["content"]:
+                # Блок результатов всегда начинается с разделителя и маркера:
+                # проверяем только начало, не сканируя весь текст
+                if part["content"].startswith(SEARCH_BLOCK_PREFIX):
                     search_results.append(part)
                 else:
                     system_prompts.append(part)
@@ -320,16 +357,7 @@ class PromptBuilder:
         """
         prompt = {
             "role": "user",
-            "content": f"""Сократи следующий текст до {max_tokens} токенов, сохранив:
-1. ВСЕ номера судебных дел
-2. ВСЕ нормы права и ссылки на законы
-3. ВСЕ ссылки на источники
-4. Наиболее важные выводы и аргументы
-
-Текст для сжатия:
-{content}
-
-Сохрани структуру и форматирование исходного текста."""
+            "content": COMPRESS_PROMPT.format(max_tokens=max_tokens, content=content)
         }
         
         try:
@@ -4,14 +4,17 @@
 """
 import os
 import logging
+import tempfile
 from typing import List, Dict, Optional, Any
 from tavily import AsyncTavilyClient
 from bs4 import BeautifulSoup
 import aiohttp
 import asyncio
 from datetime import datetime, timedelta
-import json
+import orjson
 from pathlib import Path
+from hashlib import sha256
+from app.config import HTTP_READ_BUFSIZE
 from app.utils.logger import get_logger, LogLevel
 from app.models.scraping import ScrapedContent
 
@@ -27,7 +30,6 @@ class TavilyCache:
     def _get_cache_path(self, key: str) -> Path:
         """Возвращает путь к кэш-файлу."""
         # Используем SHA-256 от ключа как имя файла
-        from hashlib import sha256
         filename = sha256(key.encode()).hexdigest() + '.json'
         return self.cache_dir / filename
         
@@ -35,16 +37,17 @@ class TavilyCache:
         """Получает данные из кэша."""
         try:
             cache_path = self._get_cache_path(key)
-            if not cache_path.exists():
+            # Один open() вместо пары exists() + open(): промах кэша — это FileNotFoundError
+            try:
+                data = orjson.loads(cache_path.read_bytes())
+            except FileNotFoundError:
                 return None
                 
-            with cache_path.open('r', encoding='utf-8') as f:
-                data = json.load(f)
-                
             # Проверяем TTL
             cached_time = datetime.fromisoformat(data['timestamp'])
             if datetime.now() - cached_time > self.ttl:
-                cache_path.unlink()
+                # Устаревшую запись могут одновременно удалять несколько читателей
+                cache_path.unlink(missing_ok=True)
                 return None
                 
             self.logger.log(f"Cache hit for key: {key[:50]}...", LogLevel.DEBUG)
@@ -61,12 +64,31 @@ class TavilyCache:
                 'timestamp': datetime.now().isoformat(),
                 'content': value
             }
-            with cache_path.open('w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            # Атомарная запись (временный файл и os.replace): параллельный get()
+            # не прочитает наполовину записанный файл
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+                raise
             self.logger.log(f"Cached data for key: {key[:50]}...", LogLevel.DEBUG)
         except Exception as e:
             self.logger.log(f"Cache write error: {str(e)}", LogLevel.ERROR)
 
+    async def aget(self, key: str) -> Optional[Dict]:
+        """Асинхронный get(): чтение файла выполняется в пуле потоков, не блокируя event loop."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Dict) -> None:
+        """Асинхронный set(): запись файла выполняется в пуле потоков."""
+        await asyncio.to_thread(self.set, key, value)
+
 class TavilyService:
     """Сервис для работы с Tavily API."""
     
@@ -80,7 +102,25 @@ class TavilyService:
             self.cache = TavilyCache()
             self.max_retries = 3
             self.retry_delay = 1  # секунды
+            # Общая сессия aiohttp для загрузки HTML страниц (создаётся лениво внутри event loop)
+            self._session: Optional[aiohttp.ClientSession] = None
             self.initialized = True
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая её при первом обращении."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=64, ttl_dns_cache=300, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30),
+                read_bufsize=HTTP_READ_BUFSIZE
+            )
+        return self._session
+
+    async def aclose(self) -> None:
+        """Закрывает общую сессию."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
             
     async def _execute_with_retry(self, func, *args, **kwargs) -> Any:
         """Выполняет функцию с ретраями."""
@@ -104,7 +144,7 @@ class TavilyService:
     async def search(self, query: str, max_results: int = 5) -> List[Dict]:
         """Выполняет поиск через Tavily API с кэшированием."""
         cache_key = f"search:{query}:{max_results}"
-        cached = self.cache.get(cache_key)
+        cached = await self.cache.aget(cache_key)
         if cached:
             return cached
             
@@ -123,7 +163,7 @@ class TavilyService:
             
             if isinstance(response, dict) and "results" in response:
                 results = response["results"]
-                self.cache.set(cache_key, results)
+                await self.cache.aset(cache_key, results)
                 self.logger.log(f"[TAVILY] Получено {len(results)} результатов", LogLevel.INFO)
                 if results:
                     self.logger.log(f"[TAVILY] Пример первого результата: {str(results[0])[:500]}...", LogLevel.DEBUG)
@@ -138,7 +178,7 @@ class TavilyService:
     async def extract_content(self, url: str, session: Optional[aiohttp.ClientSession] = None) -> ScrapedContent:
         """Извлекает контент из URL с помощью Tavily API."""
         cache_key = f"extract:{url}"
-        cached = self.cache.get(cache_key)
+        cached = await self.cache.aget(cache_key)
         if cached:
             return ScrapedContent.from_dict(cached)
             
@@ -180,7 +220,7 @@ class TavilyService:
             )
             
             # Кэшируем результат
-            self.cache.set(cache_key, result.to_dict())
+            await self.cache.aset(cache_key, result.to_dict())
             return result
             
         except Exception as e:
@@ -189,6 +229,19 @@ class TavilyService:
             
     async def extract_multiple(self, urls: List[str]) -> List[ScrapedContent]:
         """Извлекает контент из нескольких URL параллельно."""
-        async with aiohttp.ClientSession() as session:
-            tasks = [self.extract_content(url, session) for url in urls]
-            return await asyncio.gather(*tasks) 
\ No newline at end of file
+        session = self._get_session()
+        tasks = [self.extract_content(url, session) for url in urls]
+        return await asyncio.gather(*tasks)
+
+# Глобальный экземпляр сервиса
+_tavily_service = None
+
+def get_tavily_service() -> TavilyService:
+    """
+    Возвращает общий экземпляр TavilyService.
+    Создает новый при первом обращении, чтобы клиент и кэш не пересоздавались на каждый запрос.
+    """
+    global _tavily_service
+    if _tavily_service is None:
+        _tavily_service = TavilyService()
+    return _tavily_service
@@ -3,16 +3,29 @@
 """
 import aiohttp
 import asyncio
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from bs4 import BeautifulSoup
 from bs4.element import Comment
+from app.config import HTTP_READ_BUFSIZE
 from app.models.scraping import ScrapedContent
-from app.services.tavily_service import TavilyService
+from app.services.tavily_service import get_tavily_service
 from app.utils.logger import get_logger, LogLevel
 from playwright.async_api import async_playwright
 from urllib.parse import urlparse
 import re
 
+# Шаблоны CSS-классов для поиска блоков контента. BeautifulSoup применяет их
+# через search(), поэтому обрамляющие ".*" не нужны; компилируются один раз
+ARTICLE_CLASS_RE = re.compile(r'article|post|content')
+PRODUCT_CLASS_RE = re.compile(r'product|item')
+FORUM_CLASS_RE = re.compile(r'forum|comment')
+MAIN_CLASS_RE = re.compile(r'main|content')
+PRODUCT_DESCRIPTION_CLASS_RE = re.compile(r'product.*description')
+DESCRIPTION_CLASS_RE = re.compile(r'description')
+PRODUCT_DETAIL_CLASS_RE = re.compile(r'product.*detail')
+FORUM_CONTENT_CLASS_RE = re.compile(r'(?:forum|message).*content')
+FORUM_POST_CLASS_RE = re.compile(r'post|message')
+
 class ContentExtractor:
     """Класс для извлечения контента из HTML."""
     
@@ -61,11 +74,11 @@ class ContentExtractor:
         # Проверяем наличие характерных элементов
         if soup.find('article'):
             return 'article'
-        elif soup.find(class_=re.compile(r'.*article.*|.*post.*|.*content.*')):
+        elif soup.find(class_=ARTICLE_CLASS_RE):
             return 'article'
-        elif soup.find(class_=re.compile(r'.*product.*|.*item.*')):
+        elif soup.find(class_=PRODUCT_CLASS_RE):
             return 'product'
-        elif soup.find(class_=re.compile(r'.*forum.*|.*comment.*')):
+        elif soup.find(class_=FORUM_CLASS_RE):
             return 'forum'
             
         # Проверяем домен
@@ -105,22 +118,22 @@ class ContentExtractor:
             # Ищем основной контент статьи
             content = (
                 soup.find('article') or
-                soup.find(class_=re.compile(r'.*article.*|.*post.*|.*content.*')) or
+                soup.find(class_=ARTICLE_CLASS_RE) or
                 soup.find(['main', 'article']) or
-                soup.find(class_=re.compile(r'.*main.*|.*content.*'))
+                soup.find(class_=MAIN_CLASS_RE)
             )
         elif page_type == 'product':
             # Ищем описание продукта
             content = (
-                soup.find(class_=re.compile(r'.*product.*description.*')) or
-                soup.find(class_=re.compile(r'.*description.*')) or
-                soup.find(class_=re.compile(r'.*product.*detail.*'))
+                soup.find(class_=PRODUCT_DESCRIPTION_CLASS_RE) or
+                soup.find(class_=DESCRIPTION_CLASS_RE) or
+                soup.find(class_=PRODUCT_DETAIL_CLASS_RE)
             )
         elif page_type == 'forum':
             # Ищем сообщения форума
             content = (
-                soup.find(class_=re.compile(r'.*forum.*content.*|.*message.*content.*')) or
-                soup.find_all(class_=re.compile(r'.*post.*|.*message.*'))
+                soup.find(class_=FORUM_CONTENT_CLASS_RE) or
+                soup.find_all(class_=FORUM_POST_CLASS_RE)
             )
             
         if not content:
@@ -155,8 +168,26 @@ class WebScraper:
         self.max_retries = max_retries
         self.max_concurrent = max_concurrent
         self.logger = get_logger()
-        self.tavily_service = TavilyService()
+        self.tavily_service = get_tavily_service()
         self.content_extractor = ContentExtractor()
+        # Общая сессия aiohttp: соединения и DNS-ответы переиспользуются между запросами
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая её при первом обращении (внутри event loop)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrent * 4,
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(connector=connector, read_bufsize=HTTP_READ_BUFSIZE)
+        return self._session
+
+    async def aclose(self) -> None:
+        """Закрывает общую сессию."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
         
     async def scrape_url(self, url: str, dynamic: bool = False) -> ScrapedContent:
         """
@@ -177,18 +208,17 @@ class WebScraper:
     async def _scrape_static(self, url: str) -> ScrapedContent:
         """Скрапит статический контент."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=self.timeout) as response:
-                    if response.status != 200:
-                        return ScrapedContent(
-                            url=url,
-                            title="",
-                            text="",
-                            error=f"HTTP Error: {response.status}"
-                        )
-                    
-                    html = await response.text()
-                    return await self._process_html(html, url)
+            async with self._get_session().get(url, timeout=self.timeout) as response:
+                if response.status != 200:
+                    return ScrapedContent(
+                        url=url,
+                        title="",
+                        text="",
+                        error=f"HTTP Error: {response.status}"
+                    )
+                
+                html = await response.text()
+                return await self._process_html(html, url)
                     
         except Exception as e:
             self.logger.log(f"Ошибка при скрапинге {url}: {str(e)}", LogLevel.ERROR)
@@ -10,6 +10,7 @@ from app.utils.text_utils import (
     validate_context,
     detect_encoding
 )
+from app.utils.cache import TTLCache
 
 __all__ = [
     'decode_unicode', 
@@ -17,5 +18,6 @@ __all__ = [
     'sanitize_search_results',
     'validate_messages',
     'validate_context',
-    'detect_encoding'
+    'detect_encoding',
+    'TTLCache'
 ] 
\ No newline at end of file
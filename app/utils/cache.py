@@ -0,0 +1,45 @@
+"""
+Простой in-memory кеш с ограничением размера и временем жизни записей.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    LRU-кеш с временем жизни записей.
+
+    Не потокобезопасен: рассчитан на использование из одного event loop.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Возвращает значение по ключу или None, если записи нет или она устарела."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Сохраняет значение, вытесняя самую давно использованную запись при переполнении."""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Очищает кеш."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
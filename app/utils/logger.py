@@ -62,18 +62,19 @@ class EnhancedLogger:
 
     def _setup_logging_methods(self):
         """Настраивает методы логирования для совместимости со стандартным логгером."""
-        self.debug = lambda msg, *args, **kwargs: self.log(msg, LogLevel.DEBUG, *args, **kwargs)
-        self.info = lambda msg, *args, **kwargs: self.log(msg, LogLevel.INFO, *args, **kwargs)
-        self.warning = lambda msg, *args, **kwargs: self.log(msg, LogLevel.WARNING, *args, **kwargs)
-        self.error = lambda msg, *args, **kwargs: self.log(msg, LogLevel.ERROR, *args, **kwargs)
-        self.request = lambda msg, *args, **kwargs: self.log(msg, LogLevel.REQUEST, *args, **kwargs)
-        self.search = lambda msg, *args, **kwargs: self.log(msg, LogLevel.SEARCH, *args, **kwargs)
-        self.api = lambda msg, *args, **kwargs: self.log(msg, LogLevel.API, *args, **kwargs)
-        self.chat = lambda msg, *args, **kwargs: self.log(msg, LogLevel.CHAT, *args, **kwargs)
-        self.file = lambda msg, *args, **kwargs: self.log(msg, LogLevel.FILE, *args, **kwargs)
+        self.debug = lambda msg, *args, **kwargs: self.log(msg, LogLevel.DEBUG, args=args, **kwargs)
+        self.info = lambda msg, *args, **kwargs: self.log(msg, LogLevel.INFO, args=args, **kwargs)
+        self.warning = lambda msg, *args, **kwargs: self.log(msg, LogLevel.WARNING, args=args, **kwargs)
+        self.error = lambda msg, *args, **kwargs: self.log(msg, LogLevel.ERROR, args=args, **kwargs)
+        self.request = lambda msg, *args, **kwargs: self.log(msg, LogLevel.REQUEST, args=args, **kwargs)
+        self.search = lambda msg, *args, **kwargs: self.log(msg, LogLevel.SEARCH, args=args, **kwargs)
+        self.api = lambda msg, *args, **kwargs: self.log(msg, LogLevel.API, args=args, **kwargs)
+        self.chat = lambda msg, *args, **kwargs: self.log(msg, LogLevel.CHAT, args=args, **kwargs)
+        self.file = lambda msg, *args, **kwargs: self.log(msg, LogLevel.FILE, args=args, **kwargs)
         self.critical = self.error
 
-    def log(self, message: str, level: str = LogLevel.INFO, deduplicate: bool = True, context: Dict = None) -> None:
+    def log(self, message: str, level: str = LogLevel.INFO, deduplicate: bool = True,
+            context: Dict = None, args: tuple = ()) -> None:
         """
         Логирует сообщение с указанным уровнем и контекстом.
         
@@ -82,7 +83,18 @@ class EnhancedLogger:
             level: Уровень логирования
             deduplicate: Убирать ли дубликаты
             context: Дополнительный контекст для логирования
+            args: Аргументы %-подстановки в message; подставляются, только если уровень включён
         """
+        log_level = getattr(logging, level.upper(), logging.INFO)
+        if not self.logger.isEnabledFor(log_level):
+            return
+        if args:
+            # Как в стандартном logging: ошибка подстановки не должна ронять вызывающий код
+            try:
+                message = message % args
+            except (TypeError, ValueError, KeyError):
+                message = f"{message} {args!r}"
+
         if deduplicate:
             message_hash = f"{level}:{message}"
             if message_hash in self.seen_messages:
@@ -95,9 +107,12 @@ class EnhancedLogger:
         # Создаем экстра-словарь для форматтера
         extra = {'context': context_str}
         
-        log_level = getattr(logging, level.upper())
         self.logger.log(log_level, message, extra=extra)
 
+    def isEnabledFor(self, level: str) -> bool:
+        """Проверяет, будет ли записано сообщение указанного уровня."""
+        return self.logger.isEnabledFor(getattr(logging, level.upper(), logging.INFO))
+
     def log_request(self, request_data: Dict, endpoint: str, method: str):
         """Логирует входящий запрос"""
         context = {
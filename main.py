@@ -11,15 +11,19 @@ from sqlalchemy.orm import Session
 # Добавляем путь к директории scripts в путь поиска модулей Python
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SCRIPTS_DIR = os.path.join(BASE_DIR, "scripts")
-sys.path.insert(0, SCRIPTS_DIR)  # Гарантированно добавляем в начало пути
-sys.path.insert(0, BASE_DIR)     # Добавляем корневой каталог
+# Без повторов: при перезагрузке (uvicorn --reload) модуль импортируется заново
+for path in (SCRIPTS_DIR, BASE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 from app.utils.logger import get_logger
-from app.services.deepresearch_service import deep_research_service
+from app.services.deepresearch_service import deep_research_service, RESEARCH_ERROR_MESSAGE
+from app.services.tavily_service import get_tavily_service
+from app.handlers.user_doc_request import shutdown_pdf_pool
 
 # Инициализируем логгер
 logger = get_logger()
@@ -40,16 +44,17 @@ import time
 from contextlib import asynccontextmanager
 import asyncio
 
+# Корневой логгер настраивается здесь, а не в модулях сервисов
+# (если его уже настроил es_init, вызов ничего не меняет)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
 # Загрузка переменных окружения из .env файла
 load_dotenv()
 # Проверка загрузки переменных окружения
 logger.info(f"DATABASE_URL: {os.getenv('DATABASE_URL')}")
 
-# Добавляем путь к сторонним пакетам (third_party) до импорта роутеров
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
 from app.models import PromptLog, ResearchResult, User, Thread, Message
-from app.database import Base, engine, get_db
+from app.database import Base, engine, get_db, SessionLocal
 print("Импорт auth_router ОК")
 from app.auth import router as auth_router, get_current_user
 print("Импорт chat_router ОК")
@@ -59,7 +64,8 @@ from app.chat import router as chat_router
 app = FastAPI(
     title="LawGPT Chat API",
     description="API для обработки чатов с использованием DeepResearch и других источников.",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # --- Диагностика: вывод всех маршрутов ---
@@ -99,6 +105,20 @@ async def add_charset_middleware(request: Request, call_next):
 
     return response
 
+@app.on_event("startup")
+async def warm_up_embedding_model():
+    """Загружает модель эмбеддингов в фоне, чтобы первый поиск не ждал её загрузки."""
+    from app.services.embedding_service import EmbeddingService
+    app.state.embedding_warmup = asyncio.create_task(asyncio.to_thread(EmbeddingService))
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Закрывает пулы соединений общих сервисов и пул процессов разбора PDF."""
+    await deep_research_service.aclose()
+    await get_tavily_service().aclose()
+    # Пул процессов разбора PDF останавливаем в потоке, чтобы не блокировать цикл событий
+    await asyncio.to_thread(shutdown_pdf_pool)
+
 # --- Переношу вспомогательные эндпоинты под /api ---
 from fastapi import APIRouter
 api_router = APIRouter()
@@ -130,7 +150,7 @@ async def deep_research(
     if not thread:
         thread = Thread(id=thread_id, user_id=current_user.id)
         db.add(thread)
-        db.commit()
+    # Тред и сообщение пользователя сохраняем одной транзакцией
     user_message = Message(thread_id=thread_id, role="user", content=request.query)
     db.add(user_message)
     db.commit()
@@ -150,6 +170,60 @@ async def deep_research(
     # 4. Возвращаем результат в старом и новом формате
     return {"assistant_response": result.analysis, "results": result}
 
+@api_router.post("/deep-research/stream")
+async def deep_research_stream(
+    request: DeepResearchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Потоковый вариант глубокого исследования: текст ответа отдаётся по мере генерации."""
+    thread_id = request.thread_id or f"thread_{uuid.uuid4().hex}"
+    thread = db.query(Thread).filter_by(id=thread_id, user_id=current_user.id).first()
+    if not thread:
+        thread = Thread(id=thread_id, user_id=current_user.id)
+        db.add(thread)
+    user_message = Message(thread_id=thread_id, role="user", content=request.query)
+    db.add(user_message)
+    db.commit()
+    db.refresh(user_message)
+
+    # Сессия из Depends(get_db) закрывается до окончания потока,
+    # поэтому генератор работает с собственной сессией и сохранёнными идентификаторами
+    user_id = current_user.id
+    user_message_id = user_message.id
+
+    async def stream_answer():
+        parts = []
+        stream_db = SessionLocal()
+        try:
+            async for delta in deep_research_service.research_stream(
+                request.query,
+                thread_id=thread_id,
+                user_id=user_id,
+                db=stream_db,
+                message_id=user_message_id
+            ):
+                parts.append(delta)
+                yield delta
+        finally:
+            # Сохраняем ответ и при обрыве соединения, но не сообщение об ошибке
+            answer = "".join(parts)
+            try:
+                if answer and answer != RESEARCH_ERROR_MESSAGE:
+                    stream_db.add(Message(thread_id=thread_id, role="assistant", content=answer))
+                    stream_db.commit()
+            except Exception as e:
+                stream_db.rollback()
+                logger.error(f"Ошибка сохранения ответа ассистента: {str(e)}")
+            finally:
+                stream_db.close()
+
+    return StreamingResponse(
+        stream_answer(),
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Thread-Id": thread_id}
+    )
+
 @api_router.get("/items/{item_id}")
 async def read_item(item_id: int):
     logger.info(f"Получен запрос для item_id: {item_id}", context={"item_id": item_id})
@@ -202,7 +276,7 @@ app.add_middleware(
         "Access-Control-Allow-Methods",
         "Access-Control-Expose-Headers",
     ],
-    expose_headers=["X-Process-Time", "Content-Disposition"]
+    expose_headers=["X-Process-Time", "Content-Disposition", "X-Thread-Id"]
 )
 
 @asynccontextmanager
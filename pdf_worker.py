@@ -0,0 +1,14 @@
+"""
+Функция процесса пула разбора PDF.
+
+Модуль намеренно лежит вне пакета app и импортирует только PyMuPDF:
+процессы пула запускаются через spawn и импортируют его заново, поэтому
+не должны тянуть за собой подключение к БД, настройку Gemini, pandas и т.п.
+"""
+import fitz
+
+
+def extract_pdf_pages_sync(pdf_path: str, start: int, stop: int) -> str:
+    """Извлекает текстовый слой страниц [start, stop) PDF. Синхронная функция (выполняется в процессе пула)."""
+    with fitz.open(pdf_path) as doc:
+        return "".join(doc[page_num].get_text() for page_num in range(start, stop))